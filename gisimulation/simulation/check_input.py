@@ -16,12 +16,72 @@ check_input:    Checks the input parameters, logs errors and raises an
 
 @author: buechner_m <maria.buechner@gmail.com>
 """
+import collections
+import copy
+import os
 import numpy as np
 import simulation.parser_def as parser_def
 import simulation.materials as materials
 import logging
 logger = logging.getLogger(__name__)
 
+# Last successfully checked input: (fingerprint, checked parameters)
+_last_checked = None
+# Parser infos (var_names and var_keys), static, built on first use
+_parser_info = None
+# Loaded spectra: key (file, mtime, range, step, design energy), oldest
+# entry is dropped when full
+_spectrum_cache = collections.OrderedDict()
+_SPECTRUM_CACHE_SIZE = 16
+# Sample position: [reference component, index offset to reference]
+_SAMPLE_INSERT_RULES = {
+    'as': ['Source', 1],
+    'bg0': ['G0', 0],
+    'ag0': ['G0', 1],
+    'bg1': ['G1', 0],
+    'ag1': ['G1', 1],
+    'bg2': ['G2', 0],
+    'ag2': ['G2', 1],
+    'bd': ['Detector', 0]
+}
+# Components per [beam_geometry, gi_geometry]:
+#     [always included, included if defined (type_gX), sample error message]
+_GEOMETRY_SETUPS = {
+    ('parallel', 'conv'): [['G1', 'G2'], [],
+                           "Sample must be before or after G1."],
+    ('parallel', 'free'): [[], ['G1', 'G2'],
+                           "No G0 in parallel beam, invalid sample position."],
+    ('cone', 'conv'): [['G1', 'G2'], ['G0'],
+                       "Sample must be before G1."],
+    ('cone', 'sym'): [['G1', 'G2'], ['G0'],
+                      "Sample must be before or after G1."],
+    ('cone', 'inv'): [['G1', 'G2'], ['G0'],
+                      "Sample must be after G1."],
+    ('cone', 'free'): [[], ['G0', 'G1', 'G2'],
+                       "Invalid sample position."]
+}
+# Allowed grating types in GI setups: [grating, dual_phase]
+#     G0: abs or mix
+#     G1: phase or mix
+#     G2: abs or mix (classic GI), phase or mix (dual phase)
+_ALLOWED_GRATING_TYPES = {
+    ('g0', False): ('mix', 'abs'),
+    ('g0', True): ('mix', 'abs'),
+    ('g1', False): ('mix', 'phase'),
+    ('g1', True): ('mix', 'phase'),
+    ('g2', False): ('mix', 'abs'),
+    ('g2', True): ('mix', 'phase')
+}
+# Allowed sample positions: [beam_geometry, gi_geometry]
+_ALLOWED_SAMPLE_POSITIONS = {
+    ('parallel', 'conv'): frozenset(['bg1', 'ag1']),
+    ('parallel', 'free'): frozenset(['as', 'bg1', 'ag1', 'bg2', 'ag2', 'bd']),
+    ('cone', 'conv'): frozenset(['bg1']),
+    ('cone', 'sym'): frozenset(['bg1', 'ag1']),
+    ('cone', 'inv'): frozenset(['ag1']),
+    ('cone', 'free'): frozenset(_SAMPLE_INSERT_RULES)
+}
+
 # %% Classes
 
 
@@ -43,18 +103,39 @@ def _test_check_parser(parameters):
 
     parameters [dict]
 
+    Notes
+    =====
+
+    If the input (and the spectrum file, by modification time and size) is
+    identical to the last successfully checked one, the checked parameters
+    are restored instead of checking again. Warnings of the previous check
+    are not repeated.
+
     """
+    global _last_checked
+    fingerprint = _fingerprint(parameters)
+    if _last_checked is not None and fingerprint == _last_checked[0]:
+        logger.info("Input unchanged since last check, skipping checks.")
+        parameters.update(copy.deepcopy(_last_checked[1]))
+        return
+
     # Get parameter infos from parser, to link var_names and var_keys
-    parser_info = parser_def.get_arguments_info(parser_def.input_parser())
+    parser_info = _get_parser_info()
 
-    logger.info("Checking geometry input...")
-    geometry_input(parameters, parser_info)
-    logger.info("... done.")
+    try:
+        logger.info("Checking geometry input...")
+        geometry_input(parameters, parser_info)
+        logger.info("... done.")
+
+        logger.info("Checking general input...")
+        # % Minimal required input for all scenarios
+        all_input(parameters, parser_info)
+        logger.info("... done.")
+    except InputError:
+        _last_checked = None
+        raise
 
-    logger.info("Checking general input...")
-    # % Minimal required input for all scenarios
-    all_input(parameters, parser_info)
-    logger.info("... done.")
+    _last_checked = (fingerprint, copy.deepcopy(parameters))
 
 
 def all_input(parameters, parser_info):
@@ -72,20 +153,25 @@ def all_input(parameters, parser_info):
         # % Minimal required input for 'free', 'parallel', no gatings
         logger.debug("Checking general input...")
 
+        # Frequently used parameters
+        pixel_size = parameters['pixel_size']
+        design_energy = parameters['design_energy']
+        look_up_table = parameters['look_up_table']
+        detector_threshold = parameters['detector_threshold']
+        component_list = parameters['component_list']
+
         # General input:
         logger.debug("Checking simulation input...")
 
         if not parameters['sampling_rate']:
-            logger.debug("Sampling rate ({0}) is not specified, "
-                         "set to pixel size * 1e-3."
-                         .format(parser_info['sampling_rate'][0]))
+            logger.debug("Sampling rate (%s) is not specified, "
+                         "set to pixel size * 1e-3.",
+                         parser_info['sampling_rate'][0])
             # Default to pixel_size *1e-3
-            parameters['sampling_rate'] = parameters['pixel_size'] * 1e-3
-            logger.debug("Sampling rate is {0} um, with pixel size {1} "
-                         "um..".format(parameters['sampling_rate'],
-                                       parameters['pixel_size']))
-        if parameters['look_up_table'] == 'x0h' and \
-                parameters['photo_only']:
+            parameters['sampling_rate'] = pixel_size * 1e-3
+            logger.debug("Sampling rate is %s um, with pixel size %s um.",
+                         parameters['sampling_rate'], pixel_size)
+        if look_up_table == 'x0h' and parameters['photo_only']:
             warning_message = ("With X0h material LUT cannot consider only "
                                "photo-absorption, resetting to 'False'.")
             logger.warn(warning_message)
@@ -97,31 +183,11 @@ def all_input(parameters, parser_info):
         logger.debug("Checking Source input...")
         if parameters['beam_geometry'] == 'cone':
             if not parameters['focal_spot_size']:
-                error_message = ("Input argument missing: 'focal_spot_size' "
-                                 "({0})."
-                                 .format(parser_info['focal_spot_size'][0]))
-                logger.error(error_message)
-                raise InputError(error_message)
+                _fail("Input argument missing: 'focal_spot_size' ({0}).",
+                      parser_info['focal_spot_size'][0])
 
-        # Get spectrum
-        [parameters['spectrum'], min_energy, max_energy] = \
-            _get_spectrum(parameters['spectrum_file'],
-                          parameters['spectrum_range'],
-                          parameters['spectrum_step'],
-                          parameters['design_energy'])
         # Material filter
-        if parameters['thickness_filter'] and \
-                not parameters['material_filter']:
-            error_message = ("Filter material ({0}) must be specified."
-                             .format(parser_info['material_filter'][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
-        if parameters['material_filter'] and \
-                not parameters['thickness_filter']:
-            error_message = ("Filter thickness ({0}) must be specified."
-                             .format(parser_info['thickness_filter'][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
+        _check_both_or_neither('filter', 'Filter', parameters, parser_info)
         logger.debug("... done.")
 
         # Detector:
@@ -129,84 +195,58 @@ def all_input(parameters, parser_info):
         # PSF right size?
         if parameters['detector_type'] == 'conv':
             if not parameters['point_spread_function']:
-                error_message = ("Input argument missing: "
-                                 "'point_spread_function' ({0})."
-                                 .format(parser_info['point_spread_function']
-                                         [0]))
-                logger.error(error_message)
-                raise InputError(error_message)
-            if parameters['point_spread_function'] <= \
-                    parameters['pixel_size']:
+                _fail("Input argument missing: 'point_spread_function' "
+                      "({0}).", parser_info['point_spread_function'][0])
+            if parameters['point_spread_function'] <= pixel_size:
                 # PSF too small, but be larger
-                error_message = "PSF must be at larger than the pixel size."
-                logger.error(error_message)
-                raise InputError(error_message)
+                _fail("PSF must be larger than the pixel size.")
+        # Material thickness
+        _check_both_or_neither('detector', 'Detector', parameters,
+                               parser_info)
+
+        # Get spectrum (after all checks without file access)
+        [parameters['spectrum'], min_energy, max_energy] = \
+            _get_spectrum(parameters['spectrum_file'],
+                          parameters['spectrum_range'],
+                          parameters['spectrum_step'],
+                          design_energy)
 
         # Threshold (error if > max energy and warninglog if < min)
-        if parameters['detector_threshold']:
-            if parameters['detector_threshold'] > max_energy:
-                error_message = ("Detector threshold ({0}) must be <= the "
-                                 "maximal energy ({1} keV)."
-                                 .format(parser_info['detector_threshold'][0],
-                                         max_energy))
-                logger.error(error_message)
-                raise InputError(error_message)
-            elif parameters['detector_threshold'] < min_energy:
+        if detector_threshold:
+            if detector_threshold > max_energy:
+                _fail("Detector threshold ({0}) must be <= the maximal "
+                      "energy ({1} keV).",
+                      parser_info['detector_threshold'][0], max_energy)
+            elif detector_threshold < min_energy:
                 logger.warning("Detector threshold ({0}) is smaller than the "
-                               "minimal energy ){1} keV)."
+                               "minimal energy ({1} keV)."
                                .format(parser_info['detector_threshold'][0],
                                        min_energy))
-
-        # Material thickness
-        if parameters['thickness_detector'] and \
-                not parameters['material_detector']:
-            error_message = ("Detector material ({0}) must be specified."
-                             .format(parser_info['material_detector'][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
-        if parameters['material_detector'] and \
-                not parameters['thickness_detector']:
-            error_message = ("Detector thickness ({0}) must be specified."
-                             .format(parser_info['thickness_detector'][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
         logger.debug("... done.")
 
         # Check all selected gratings (materials and phase/absorption)
-        if 'G0' in parameters['component_list']:
-            logger.debug("Checking G0...")
-            _check_grating_input('g0', parameters, parser_info, False)
-            logger.debug("... done.")
-        if 'G1' in parameters['component_list']:
-            logger.debug("Checking G1...")
-            _check_grating_input('g1', parameters, parser_info, False)
-            logger.debug("... done.")
-        if 'G2' in parameters['component_list']:
-            logger.debug("Checking G2...")
-            _check_grating_input('g2', parameters, parser_info, False)
-            logger.debug("... done.")
+        components = set(component_list)
+        for grating in ['G0', 'G1', 'G2']:
+            if grating in components:
+                logger.debug("Checking %s...", grating)
+                _check_grating_input(grating.lower(), parameters, parser_info,
+                                     False)
+                logger.debug("... done.")
 
         # Check all materials if exist
         try:
             for var_name, value in parameters.iteritems():
                 if 'material' in var_name and value:
-                    materials.test_material(value, parameters['design_energy'],
-                                            parameters['look_up_table'])
+                    materials.test_material(value, design_energy,
+                                            look_up_table)
         except materials.MaterialError as e:
-            error_message = ("Invalid material name in '{0}' ({1}): {2}"
-                             .format(var_name,
-                                     parser_info[var_name][0],
-                                     str(e)))
-            logger.error(error_message)
-            raise InputError(error_message)
+            _fail("Invalid material name in '{0}' ({1}): {2}", var_name,
+                  parser_info[var_name][0], str(e))
 
         logger.debug("... done.")  # General checking
 
     except AttributeError as e:
-        error_message = "Input arguments missing: {}." \
-                        .format(str(e).split()[-1])
-        logger.error(error_message)
-        raise InputError(error_message)
+        _fail("Input arguments missing: {}.", _missing_name(e))
 
 
 def geometry_input(parameters, parser_info):
@@ -224,30 +264,32 @@ def geometry_input(parameters, parser_info):
         # % Minimal required input for 'free', 'parallel', no gatings
         logger.debug("Checking geometry input...")
 
+        # Frequently used parameters
+        beam_geometry = parameters['beam_geometry']
+        gi_geometry = parameters['gi_geometry']
+        sample_position = parameters['sample_position']
+        fixed_grating = parameters['fixed_grating']
+        dual_phase = parameters['dual_phase']
+
         # GI Design:
         logger.debug("Checking GI input...")
-        if parameters['gi_geometry'] != 'free':
+        if gi_geometry != 'free':
             # If GI, talbot order necessary (unless dual_phase)
-            if not parameters['talbot_order'] and not parameters['dual_phase']:
-                error_message = ("Input argument missing: 'talbot_order' "
-                                 "({0})."
-                                 .format(parser_info['talbot_order'][0]))
-                logger.error(error_message)
-                raise InputError(error_message)
+            if not parameters['talbot_order'] and not dual_phase:
+                _fail("Input argument missing: 'talbot_order' ({0}).",
+                      parser_info['talbot_order'][0])
         else:
-            if parameters['fixed_grating']:
+            if fixed_grating:
                 # If free geom and fixed_grating defined
                 warning_message = ("Disregarding fixed grating choice for "
                                    "free geometry. Resetting to None.")
                 logger.warning(warning_message)
+                fixed_grating = None
                 parameters['fixed_grating'] = None
         # Dual phase
-        if parameters['dual_phase'] and parameters['gi_geometry'] != 'conv':
-            error_message = ("Dual phase setup can only be calculated for "
-                             "conventional geometry. Geometry is '{0}'."
-                             .format(parameters['gi_geometry']))
-            logger.error(error_message)
-            raise InputError(error_message)
+        if dual_phase and gi_geometry != 'conv':
+            _fail("Dual phase setup can only be calculated for conventional "
+                  "geometry. Geometry is '{0}'.", gi_geometry)
         # Store design wavelength
         parameters['design_wavelength'] = \
             materials.energy_to_wavelength(parameters['design_energy'])
@@ -257,538 +299,166 @@ def geometry_input(parameters, parser_info):
         # Special scenarios:
         logger.debug("Checking geometry scenarios...")
 
-        if (parameters['beam_geometry'] == 'parallel' and
-                parameters['gi_geometry'] == 'sym') or \
-                (parameters['beam_geometry'] == 'parallel' and
-                 parameters['gi_geometry'] == 'inv'):
-            error_message = ("Only '{0}' geometry valid for '{1}' beam "
-                             "geometry."
-                             .format(parameters['gi_geometry'],
-                                     parameters['beam_geometry']))
-            logger.error(error_message)
-            raise InputError(error_message)
-
-        parameters['component_list'] = ['Source', 'Detector']
-
-        if parameters['beam_geometry'] == 'parallel':
-
-            # Individual checks
-            if parameters['gi_geometry'] == 'conv':
-                # =============================================================
-                # Conventional and parallel beam
-                #
-                # Conditions:
-                #     no G0
-                #     sample before or after G1 (bg1 or ag1)
-                # Requirements:
-                #     G1 and G2, one of them fixed
-                # =============================================================
-                logger.debug("Checking 'conv' geometry...")
-                # Add G1 and G2
-                parameters['component_list'].append('G1')
-                parameters['component_list'].append('G2')
-                # Sort updated component list
-                parameters['component_list'].sort()
-                # After sort, switch Source and Detector
-                parameters['component_list'][0], \
-                    parameters['component_list'][-1] = \
-                    parameters['component_list'][-1], \
-                    parameters['component_list'][0]
-
+        if beam_geometry == 'parallel' and \
+                (gi_geometry == 'sym' or gi_geometry == 'inv'):
+            _fail("Only '{0}' geometry valid for '{1}' beam geometry.",
+                  gi_geometry, beam_geometry)
+
+        component_list = ['Source', 'Detector']
+        parameters['component_list'] = component_list
+
+        # =====================================================================
+        # Components per geometry (see _GEOMETRY_SETUPS)
+        #
+        # Parallel beam:
+        #     no G0
+        #     conv:   G1 and G2, sample before or after G1 (bg1 or ag1)
+        #     free:   G1 and/or G2 (if defined)
+        # Cone beam:
+        #     conv:   G0 (optional), G1 and G2, sample before G1 (bg1)
+        #     sym:    G0 (optional), G1 and G2, sample before or after G1
+        #             (bg1 or ag1)
+        #     inv:    G0 (optional), G1 and G2, sample after G1 (ag1)
+        #     free:   G0, G1 and/or G2 (if defined)
+        # =====================================================================
+        logger.debug("Checking '%s' beam and '%s' geometry...",
+                     beam_geometry, gi_geometry)
+        if beam_geometry == 'cone' and gi_geometry != 'free' and \
+                dual_phase and parameters['type_g0']:
+            _fail("Dual phase setup cannot include G0.")
+        _assemble_components(component_list, parameters,
+                             (beam_geometry, gi_geometry), sample_position)
+
+        if gi_geometry != 'free':
+            # Requirements:
+            #     1 fixed grating
+            #     cone beam: distance from source (or G0) to G1 OR G2
+            #     cone beam and conv: distances G1 to G2 and G2 to detector
+            if beam_geometry == 'parallel':
                 # Fixed grating
-                if parameters['fixed_grating'] == 'g0':
-                    error_message = "The fixed grating must be either G1 or "
-                    "G2."
-                    logger.error(error_message)
-                    raise InputError(error_message)
-                elif not parameters['fixed_grating']:
-                    error_message = ("Choose G1 or G2 as fixed grating ({0})."
-                                     .format(parser_info['fixed_grating'][0]))
-                    logger.error(error_message)
-                    raise InputError(error_message)
-
-                # Sample position (if defined)
-                if parameters['sample_position']:
-                    g1_index = parameters['component_list'].index('G1')
-                    if parameters['sample_position'] == 'bg1':
-                        parameters['component_list'].insert(g1_index,
-                                                            'Sample')
-                    elif parameters['sample_position'] == 'ag1':
-                        parameters['component_list'].insert(g1_index+1,
-                                                            'Sample')
-                    else:
-                        error_message = "Sample must be before or after G1."
-                        logger.error(error_message)
-                        raise InputError(error_message)
-                logger.debug("... done.")
+                if fixed_grating == 'g0':
+                    _fail("The fixed grating must be either G1 or G2.")
+                elif not fixed_grating:
+                    _fail("Choose G1 or G2 as fixed grating ({0}).",
+                          parser_info['fixed_grating'][0])
             else:
-                # =============================================================
-                # Free and parallel beam
-                #
-                # Conditions:
-                #     no G0
-                # Requirements:
-                #     all distances between components must be given
-                # =============================================================
-                logger.debug("Checking 'free' geometry...")
-                # Add all other components
-                if parameters['type_g1']:
-                    parameters['component_list'].append('G1')
-                if parameters['type_g2']:
-                    parameters['component_list'].append('G2')
-                # Sort updated component list
-                parameters['component_list'].sort()
-                # After sort, switch Source and Detector
-                parameters['component_list'][0], \
-                    parameters['component_list'][-1] = \
-                    parameters['component_list'][-1], \
-                    parameters['component_list'][0]
-                # Add sample
-                if parameters['sample_position']:
-                    if parameters['sample_position'] == 'as':
-                        parameters['component_list'].insert(1, 'Sample')
-                    elif parameters['sample_position'] == 'bg1':
-                        reference_index = \
-                            parameters['component_list'].index('G1')
-                        parameters['component_list'].insert(reference_index,
-                                                            'Sample')
-                    elif parameters['sample_position'] == 'ag1':
-                        reference_index = \
-                            parameters['component_list'].index('G1')
-                        parameters['component_list'].insert(reference_index+1,
-                                                            'Sample')
-                    elif parameters['sample_position'] == 'bg2':
-                        reference_index = \
-                            parameters['component_list'].index('G2')
-                        parameters['component_list'].insert(reference_index,
-                                                            'Sample')
-                    elif parameters['sample_position'] == 'ag2':
-                        reference_index = \
-                            parameters['component_list'].index('G2')
-                        parameters['component_list'].insert(reference_index+1,
-                                                            'Sample')
-                    else:
-                        # 'bd'
-                        parameters['component_list'].insert(-1, 'Sample')
-                logger.debug("... done.")
-
-            logger.debug("... done.")
-        else:
-            # Cone beam
-            logger.debug("Checking 'cone' beam geometry...")
-            if parameters['gi_geometry'] != 'free':
-                logger.debug("Checking GI geometries...")
-                # Common checks for not 'free' geometry
-                # Add G1 and G2
-                parameters['component_list'].append('G1')
-                parameters['component_list'].append('G2')
-                # G0
-                if not parameters['type_g0']:
-                    # No G0
-                    if parameters['fixed_grating'] == 'g0':
-                        if parameters['dual_pahse']:
-                            error_message = "G0 is not defined, choose G1 "
-                            "as fixed grating."
+                # Fixed grating
+                if 'G0' not in component_list:
+                    if fixed_grating == 'g0':
+                        if dual_phase:
+                            _fail("G0 is not defined, choose G1 as fixed "
+                                  "grating.")
                         else:
-                            error_message = "G0 is not defined, choose G1 or "
-                            "G2 as fixed grating."
-                        logger.error(error_message)
-                        raise InputError(error_message)
-                    elif (parameters['fixed_grating'] == 'g2' and
-                          parameters['dual_pahse']):
-                        error_message = "G1 must be fixed in dual phase "
-                        "setup, not G2."
-                        logger.error(error_message)
-                        raise InputError(error_message)
-                    elif not parameters['fixed_grating']:
-                        if parameters['dual_pahse']:
-                            error_message = ("Choose G1 as fixed grating "
-                                             "({0})."
-                                             .format(parser_info
-                                                     ['fixed_grating'][0]))
+                            _fail("G0 is not defined, choose G1 or G2 as "
+                                  "fixed grating.")
+                    elif fixed_grating == 'g2' and dual_phase:
+                        _fail("G1 must be fixed in dual phase setup, not G2.")
+                    elif not fixed_grating:
+                        if dual_phase:
+                            _fail("Choose G1 as fixed grating ({0}).",
+                                  parser_info['fixed_grating'][0])
                         else:
-                            error_message = ("Choose G1 or G2 as fixed "
-                                             "grating ({0})."
-                                             .format(parser_info
-                                                     ['fixed_grating'][0]))
-                        logger.error(error_message)
-                        raise InputError(error_message)
-                    # Fixed distance
-                    if parameters['gi_geometry'] != 'sym':
-                        if not parameters['distance_source_g1'] and \
-                                not parameters['distance_source_g2']:
-                            error_message = ("Either distance from Source to "
-                                             "G1 ({0}) OR Source to G2 ({1}) "
-                                             "must be defined [mm]."
-                                             .format(parser_info
-                                                     ['distance_source_g1'][0],
-                                                     parser_info
-                                                     ['distance_source_g2']
-                                                     [0]))
-                            logger.error(error_message)
-                            raise InputError(error_message)
-                        elif parameters['distance_source_g1'] and \
-                                parameters['distance_source_g2']:
-                            if parameters['fixed_distance']:
-                                logger.warning("Both distance from Source to "
-                                               "G1 ({0}) AND Source to G2 "
-                                               "({1}) are defined, choosing "
-                                               "last choice of set distance "
-                                               "({2})."
-                                               .format(parser_info
-                                                       ['distance_g0_g1'][0],
-                                                       parser_info
-                                                       ['distance_g0_g2'][0],
-                                                       parameters
-                                                       ['fixed_distance']))
-                                fixed_distance = parameters['fixed_distance']
-                            else:
-                                # Fixed distance not defined
-                                error_message = ("Either distance from Source "
-                                                 "to G1 ({0}) OR Source to G2 "
-                                                 "({1}) must be defined [mm]."
-                                                 .format(parser_info
-                                                         ['distance_g0_g1'][0],
-                                                         parser_info
-                                                         ['distance_g0_g2']
-                                                         [0]))
-                                logger.error(error_message)
-                                raise InputError(error_message)
-                        elif parameters['distance_source_g1']:
-                            fixed_distance = 'distance_source_g1'
-                        elif parameters['distance_source_g2']:
-                            fixed_distance = 'distance_source_g2'
-                    else:
-                        fixed_distance = None
+                            _fail("Choose G1 or G2 as fixed grating ({0}).",
+                                  parser_info['fixed_grating'][0])
+                elif not fixed_grating:
+                    _fail("Choose G0, G1 or G2 as fixed grating ({0}).",
+                          parser_info['fixed_grating'][0])
+                # Fixed distance (from Source, or G0 if defined)
+                if gi_geometry == 'sym':
+                    fixed_distance = None
+                elif 'G0' in component_list:
+                    fixed_distance = \
+                        _pick_fixed_distance('distance_g0_g1',
+                                             'distance_g0_g2',
+                                             parameters, parser_info)
                 else:
-                    # With G0
-                    # Add to component list (unless dual_phase)
-                    if not parameters['dual_phase']:
-                        parameters['component_list'].append('G0')
-                    else:
-                        error_message = ("Dual phase setup cannot include G0.")
-                        logger.error(error_message)
-                        raise InputError(error_message)
-                    if not parameters['fixed_grating']:
-                        error_message = ("Choose G0, G1 or G2 as fixed "
-                                         "grating ({0})."
-                                         .format(parser_info['fixed_grating']
-                                                 [0]))
-                        logger.error(error_message)
-                        raise InputError(error_message)
-                    # Fixed distance
-                    if parameters['gi_geometry'] != 'sym':
-                        if not parameters['distance_g0_g1'] and \
-                                not parameters['distance_g0_g2']:
-                            error_message = ("Either distance from G0 to G1 "
-                                             "({0}) OR G0 to G2 ({1}) must be "
-                                             "defined [mm]."
-                                             .format(parser_info
-                                                     ['distance_g0_g1'][0],
-                                                     parser_info
-                                                     ['distance_g0_g2'][0]))
-                            logger.error(error_message)
-                            raise InputError(error_message)
-                        elif parameters['distance_g0_g1'] and \
-                                parameters['distance_g0_g2']:
-                            if parameters['fixed_distance']:
-                                logger.warning("Both distance from G0 to G1 "
-                                               "({0}) AND G0 to G2 ({1}) are "
-                                               "defined, choosing last choice "
-                                               "of set distance ({2})."
-                                               .format(parser_info
-                                                       ['distance_g0_g1'][0],
-                                                       parser_info
-                                                       ['distance_g0_g2'][0],
-                                                       parameters
-                                                       ['fixed_distance']))
-                                fixed_distance = parameters['fixed_distance']
-                            else:
-                                # Fixed distance not defined
-                                error_message = ("Either distance from G0 to "
-                                                 "G1 ({0}) OR G0 to G2 ({1}) "
-                                                 "must be defined [mm]."
-                                                 .format(parser_info
-                                                         ['distance_g0_g1'][0],
-                                                         parser_info
-                                                         ['distance_g0_g2']
-                                                         [0]))
-                                logger.error(error_message)
-                                raise InputError(error_message)
-                        elif parameters['distance_g0_g1']:
-                            fixed_distance = 'distance_g0_g1'
-                        elif parameters['distance_g0_g2']:
-                            fixed_distance = 'distance_g0_g2'
-                    else:
-                        fixed_distance = None  # Sym
+                    fixed_distance = \
+                        _pick_fixed_distance('distance_source_g1',
+                                             'distance_source_g2',
+                                             parameters, parser_info)
                 parameters['fixed_distance'] = fixed_distance
 
-                # Sort updated component list
-                parameters['component_list'].sort()
-                # After sort, switch Source and Detector
-                parameters['component_list'][0], \
-                    parameters['component_list'][-1] = \
-                    parameters['component_list'][-1], \
-                    parameters['component_list'][0]
-
-                # Individaul checks
-                if parameters['gi_geometry'] == 'conv':
-                    # =========================================================
-                    # Conventional and cone beam
-                    #
-                    # Conditions:
-                    #     G0 optional
-                    #     sample before G1 (bg1)
-                    #     distance G2 to detector optional
-                    #     distance from source (or G0) to G1
-                    #       OR
-                    #     distance from source (or G0) to G1
-                    # Requirements:
-                    #     G1 and G2
-                    #     1 fixed grating
-                    #
-                    # =========================================================
-                    logger.debug("Checking 'conv' geometry...")
-                    # Sample position (if defined)
-                    if parameters['sample_position']:
-                        g1_index = parameters['component_list'].index('G1')
-                        if parameters['sample_position'] == 'bg1':
-                            parameters['component_list'].insert(g1_index,
-                                                                'Sample')
-                        else:
-                            error_message = "Sample must be before G1."
-                            logger.error(error_message)
-                            raise InputError(error_message)
+                if gi_geometry == 'conv':
                     # Dual phase manual distances set?
                     if not parameters['distance_g1_g2']:
-                        error_message = "Distance from G1 to G2 must be "
-                        "defined."
-                        logger.error(error_message)
-                        raise InputError(error_message)
+                        _fail("Distance from G1 to G2 must be defined.")
                     elif parameters['distance_g1_g2'] == 0:
-                        error_message = "Distance from G1 to G2 must be "
-                        "larger than 0."
-                        logger.error(error_message)
-                        raise InputError(error_message)
+                        _fail("Distance from G1 to G2 must be larger than 0.")
                     if not parameters['distance_g2_detector']:
-                        error_message = "Distance from G2 to the detector "
-                        "must be defined."
-                        logger.error(error_message)
-                        raise InputError(error_message)
+                        _fail("Distance from G2 to the detector must be "
+                              "defined.")
                     elif parameters['distance_g2_detector'] == 0:
-                        error_message = "Distance from G2 to the detector "
-                        "must be larger than 0."
-                        logger.error(error_message)
-                        raise InputError(error_message)
-
-                    logger.debug("... done.")
-                elif parameters['gi_geometry'] == 'sym':
-                    # =========================================================
-                    # Symmetrical and cone beam
-                    #
-                    # Conditions:
-                    #     G0 optional
-                    #     sample before or after G1 (bg1 or ag1)
-                    #     distance G2 to detector optional
-                    #     distance from source (or G0) to G1
-                    #       OR
-                    #     distance from source (or G0) to G1
-                    # Requirements:
-                    #     G1 and G2
-                    #     1 fixed grating
-                    #
-                    # =========================================================
-                    logger.debug("Checking 'sym' geometry...")
-                    # Sample position (if defined)
-                    if parameters['sample_position']:
-                        g1_index = parameters['component_list'].index('G1')
-                        if parameters['sample_position'] == 'bg1':
-                            parameters['component_list'].insert(g1_index,
-                                                                'Sample')
-                        elif parameters['sample_position'] == 'ag1':
-                            parameters['component_list'].insert(g1_index+1,
-                                                                'Sample')
-                        else:
-                            error_message = ("Sample must be before or after "
-                                             "G1.")
-                            logger.error(error_message)
-                            raise InputError(error_message)
-                    logger.debug("... done.")
-                elif parameters['gi_geometry'] == 'inv':
-                    # =========================================================
-                    # Inverse and cone beam
-                    #
-                    # Conditions:
-                    #     G0 optional
-                    #     sample after G1 (ag1)
-                    #     distance G2 to detector optional
-                    #     distance from source (or G0) to G1
-                    #       OR
-                    #     distance from source (or G0) to G1
-                    # Requirements:
-                    #     G1 and G2
-                    #     1 fixed grating
-                    #
-                    # =========================================================
-                    logger.debug("Checking 'inv' geometry...")
-                    # Sample position (if defined)
-                    if parameters['sample_position']:
-                        g1_index = parameters['component_list'].index('G1')
-                        if parameters['sample_position'] == 'ag1':
-                            parameters['component_list'].insert(g1_index+1,
-                                                                'Sample')
-                        else:
-                            error_message = ("Sample must be before or after "
-                                             "G1.")
-                            logger.error(error_message)
-                            raise InputError(error_message)
-                    logger.debug("... done.")
-                logger.debug("... done.")
-            else:
-                # =============================================================
-                # Free and cone beam
-                #
-                # Conditions:
-                #
-                # Requirements:
-                #     all distances between components must be given
-                # =============================================================
-                logger.debug("Checking 'free' geometry...")
-                # Add all other components
-                if parameters['type_g0']:
-                    parameters['component_list'].append('G0')
-                if parameters['type_g1']:
-                    parameters['component_list'].append('G1')
-                if parameters['type_g2']:
-                    parameters['component_list'].append('G2')
-                # Sort updated component list
-                parameters['component_list'].sort()
-                # After sort, switch Source and Detector
-                parameters['component_list'][0], \
-                    parameters['component_list'][-1] = \
-                    parameters['component_list'][-1], \
-                    parameters['component_list'][0]
-                # Add sample
-                if parameters['sample_position']:
-                    if parameters['sample_position'] == 'as':
-                        parameters['component_list'].insert(1, 'Sample')
-                    elif parameters['sample_position'] == 'bg0':
-                        reference_index = \
-                            parameters['component_list'].index('G0')
-                        parameters['component_list'].insert(reference_index,
-                                                            'Sample')
-                    elif parameters['sample_position'] == 'ag0':
-                        reference_index = \
-                            parameters['component_list'].index('G0')
-                        parameters['component_list'].insert(reference_index+1,
-                                                            'Sample')
-                    elif parameters['sample_position'] == 'bg1':
-                        reference_index = \
-                            parameters['component_list'].index('G1')
-                        parameters['component_list'].insert(reference_index,
-                                                            'Sample')
-                    elif parameters['sample_position'] == 'ag1':
-                        reference_index = \
-                            parameters['component_list'].index('G1')
-                        parameters['component_list'].insert(reference_index+1,
-                                                            'Sample')
-                    elif parameters['sample_position'] == 'bg2':
-                        reference_index = \
-                            parameters['component_list'].index('G2')
-                        parameters['component_list'].insert(reference_index,
-                                                            'Sample')
-                    elif parameters['sample_position'] == 'ag2':
-                        reference_index = \
-                            parameters['component_list'].index('G2')
-                        parameters['component_list'].insert(reference_index+1,
-                                                            'Sample')
-                    else:
-                        # 'bd'
-                        parameters['component_list'].insert(-1, 'Sample')
-                logger.debug("... done.")
-
-            logger.debug("... done.")
+                        _fail("Distance from G2 to the detector must be "
+                              "larger than 0.")
+        logger.debug("... done.")
 
         # Set optional distances from None to 0
-        if parameters['beam_geometry'] == 'cone' and \
-                parameters['gi_geometry'] != 'free':
+        if beam_geometry == 'cone' and gi_geometry != 'free':
             # G2 to detector
             if parameters['distance_g2_detector'] is None:
                 logger.debug("Setting undefined optional distance "
                              "'distance_g2_detector to: 0")
                 parameters['distance_g2_detector'] = 0.0
 
-            if 'G0' in parameters['component_list'] and \
+            if 'G0' in component_list and \
                     parameters['distance_source_g0'] is None:
                 logger.debug("Setting undefined optional distance "
                              "'distance_source_g0' to: 0")
                 parameters['distance_source_g0'] = 0.0
 
         # Info
-        logger.info("Beam geometry is '{0}' and setup geometry is '{1}'."
-                    .format(parameters['beam_geometry'],
-                            parameters['gi_geometry']))
-        logger.info("Setup consists of: {0}."
-                    .format(parameters['component_list']))
-        if 'Sample' not in parameters['component_list']:
+        logger.info("Beam geometry is '%s' and setup geometry is '%s'.",
+                    beam_geometry, gi_geometry)
+        logger.info("Setup consists of: %s.", component_list)
+        if 'Sample' not in component_list:
             logger.info("No sample included.")
 
         # Check fixed grating
-        if parameters['gi_geometry'] != 'free':
-            logger.info("Fixed grating is: '{0}'."
-                        .format(parameters['fixed_grating']))
+        if gi_geometry != 'free':
+            logger.info("Fixed grating is: '%s'.", fixed_grating)
             # Fixed grating
-            logger.debug("Checking {0}...".format(parameters['fixed_grating']))
-            _check_grating_input(parameters['fixed_grating'], parameters,
-                                 parser_info, True)
+            logger.debug("Checking %s...", fixed_grating)
+            _check_grating_input(fixed_grating, parameters, parser_info,
+                                 True)
             logger.debug("... done.")
             # Check G2 if dual phase as if it was fixed for phase shift
             # settings (G1 is fixed)
-            if parameters['dual_phase']:
+            if dual_phase:
                 logger.debug("Checking G2...")
-                fixed_grating = parameters['fixed_grating']
                 parameters['fixed_grating'] = 'g2'
                 _check_grating_input('g2', parameters, parser_info, True)
                 parameters['fixed_grating'] = fixed_grating
                 logger.debug("... done.")
             # Fixed distance
-            if parameters['beam_geometry'] == 'cone':
-                logger.info("Fixed distance is: {0}."
-                            .format(fixed_distance))
+            if beam_geometry == 'cone':
+                logger.info("Fixed distance is: %s.", fixed_distance)
 
         # Check remaining components
         # Sample distance, shape, material etc.
         logger.debug("Checking remaining components...")
-        if 'Sample' in parameters['component_list']:
+        if 'Sample' in component_list:
             logger.debug("Checking sample input...")
             if not parameters['sample_distance']:
-                error_message = ("Distance from sample to reference component "
-                                 "must be specified.")
-                logger.error(error_message)
-                raise InputError(error_message)
+                _fail("Distance from sample to reference component must be "
+                      "specified.")
             # ########## Temp ########################
             if not parameters['sample_diameter']:
-                error_message = "Sample diameter must be specified."
-                logger.error(error_message)
-                raise InputError(error_message)
+                _fail("Sample diameter must be specified.")
             # ########## Temp ########################
             logger.debug("... done.")
 
-        if parameters['gi_geometry'] == 'free':
+        if gi_geometry == 'free':
             # Chack all necessary distances
             logger.debug("Checking distances for 'free' input...")
-            for index, component in \
-                    enumerate(parameters['component_list'][:-1]):
-                current_distance = ('distance_' + component.lower() + '_' +
-                                    parameters['component_list'][index+1]
-                                    .lower())
+            components = [component.lower() for component in component_list]
+            distances = ['distance_{0}_{1}'.format(first, second)
+                         for first, second in zip(components[:-1],
+                                                  components[1:])]
+            for current_distance in distances:
                 if not parameters[current_distance]:
-                    error_message = ("{0} ({1}) not defined."
-                                     .format(parser_info[current_distance][1]
-                                             .split('.')[0],
-                                             parser_info[current_distance][0]))
-                    logger.error(error_message)
-                    raise InputError(error_message)
+                    _fail("{0} ({1}) not defined.",
+                          parser_info[current_distance][1].split('.')[0],
+                          parser_info[current_distance][0])
 
             logger.debug("... done.")
 
@@ -800,20 +470,300 @@ def geometry_input(parameters, parser_info):
         logger.debug("... done.")
 
     except AttributeError as e:
-        error_message = "Input arguments missing: {}." \
-                        .format(str(e).split()[-1])
-        logger.error(error_message)
-        raise InputError(error_message)
+        _fail("Input arguments missing: {}.", _missing_name(e))
 
 # %% Public utility functions
 
 
+def clear_spectrum_cache():
+    """
+    Forget all loaded spectra, to force re-reading of spectrum files.
+    """
+    _spectrum_cache.clear()
+
+
 # %% Private checking functions
 
+def _check_both_or_neither(component, name, parameters, parser_info):
+    """
+    Check that thickness and material of a component are either both or
+    neither defined.
+
+    Parameters
+    ==========
+
+    component [str]:        'filter' or 'detector'
+    name [str]:             name of component in error message
+    parameters [dict]
+    parser_info [dict]
+
+    """
+    thickness = 'thickness_' + component
+    material = 'material_' + component
+    if parameters[thickness] and not parameters[material]:
+        _fail("{0} material ({1}) must be specified.",
+              name, parser_info[material][0])
+    if parameters[material] and not parameters[thickness]:
+        _fail("{0} thickness ({1}) must be specified.",
+              name, parser_info[thickness][0])
+
+
+def _assemble_components(component_list, parameters, setup,
+                         sample_position):
+    """
+    Set component list in beam order (Source, G0, G1, G2, Detector), with
+    gratings according to the geometry setup and the sample (if defined) at
+    its position.
+
+    Parameters
+    ==========
+
+    component_list [list]:      updated in place
+    parameters [dict]
+    setup [tuple]:              (beam_geometry, gi_geometry)
+    sample_position [str]:      e.g. 'bg1' (see _SAMPLE_INSERT_RULES)
+
+    """
+    [required, optional, sample_error] = _GEOMETRY_SETUPS[setup]
+    components = ['Source']
+    components.extend(grating for grating in ['G0', 'G1', 'G2']
+                      if grating in required or
+                      (grating in optional and
+                       parameters['type_' + grating.lower()]))
+    components.append('Detector')
+
+    if not sample_position:
+        component_list[:] = components
+        return
+    if sample_position not in _ALLOWED_SAMPLE_POSITIONS[setup]:
+        _fail(sample_error)
+    [reference, offset] = _SAMPLE_INSERT_RULES[sample_position]
+    if reference not in components:
+        _fail("Sample position '{0}' requires {1} in setup.",
+              sample_position, reference)
+    del component_list[:]
+    for component in components:
+        if component == reference and offset == 0:
+            component_list.append('Sample')
+        component_list.append(component)
+        if component == reference and offset == 1:
+            component_list.append('Sample')
+
+
+def _pick_fixed_distance(first, second, parameters, parser_info):
+    """
+    Select the fixed distance of a cone beam setup, out of two possible
+    distances (e.g. 'distance_source_g1' and 'distance_source_g2').
+
+    Parameters
+    ==========
+
+    first [str]:            key of first possible distance
+    second [str]:           key of second possible distance
+    parameters [dict]
+    parser_info [dict]
+
+    Returns
+    =======
+
+    fixed_distance [str]:   key of the selected distance
+
+    Notes
+    =====
+
+    If both distances are defined, the last set distance
+    (parameters['fixed_distance']) is chosen.
+
+    """
+    if parameters[first] and not parameters[second]:
+        return first
+    if parameters[second] and not parameters[first]:
+        return second
+    # Both or none defined
+    [from_, to_first] = [name.capitalize()
+                         for name in first.split('_')[1:]]
+    to_second = second.split('_')[-1].capitalize()
+    if parameters[first] and parameters['fixed_distance']:
+        logger.warning("Both distance from {0} to {1} ({2}) AND {0} to {3} "
+                       "({4}) are defined, choosing last choice of set "
+                       "distance ({5})."
+                       .format(from_, to_first, parser_info[first][0],
+                               to_second, parser_info[second][0],
+                               parameters['fixed_distance']))
+        return parameters['fixed_distance']
+    _fail("Either distance from {0} to {1} ({2}) OR {0} to {3} ({4}) must be "
+          "defined [mm].", from_, to_first, parser_info[first][0],
+          to_second, parser_info[second][0])
+
 
 # %% Private utility functions
 
+def _fail(error_message, *args):
+    """
+    Log error message and raise InputError.
+
+    Parameters
+    ==========
+
+    error_message [str]:    formatted with args (str.format), if given
+    args:                   format arguments
+
+    Notes
+    =====
+
+    The message is only formatted when the check actually fails.
+
+    """
+    if args:
+        error_message = error_message.format(*args)
+    logger.error(error_message)
+    raise InputError(error_message)
+
+
+def _missing_name(error):
+    """
+    Return the name of the missing attribute from an AttributeError.
+
+    Parameters
+    ==========
+
+    error [AttributeError]
+
+    """
+    name = getattr(error, 'name', None)
+    if name is None:
+        # e.g. "'dict' object has no attribute 'name'"
+        name = error.args[0].rsplit(' ', 1)[-1].strip('\'"')
+    return name
+
+
+def _get_parser_info():
+    """
+    Return parser infos, to link var_names and var_keys.
+
+    Notes
+    =====
+
+    The parser definition is static, thus the infos are only built on first
+    call and reused afterwards.
+
+    """
+    global _parser_info
+    if _parser_info is None:
+        _parser_info = parser_def.get_arguments_info(parser_def.input_parser())
+    return _parser_info
+
+
+def _fingerprint(parameters):
+    """
+    Hashable representation of the input parameters, to detect unchanged
+    input.
+
+    Parameters
+    ==========
+
+    parameters [dict]
+
+    Returns
+    =======
+
+    fingerprint [tuple]
+
+    Notes
+    =====
+
+    'component_list' is skipped, since it is set during the checks. The
+    state of the spectrum file is included (see _spectrum_file_key), so an
+    edited file is checked and loaded again.
+
+    """
+    return (tuple(sorted((var_name, _hashable(value))
+                         for var_name, value in parameters.items()
+                         if var_name != 'component_list')),
+            _spectrum_file_key(parameters.get('spectrum_file')))
+
+
+def _hashable(value):
+    """
+    Converts numpy arrays, lists and dicts into hashable tuples.
+
+    """
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    elif isinstance(value, dict):
+        return tuple(sorted((key, _hashable(item))
+                            for key, item in value.items()))
+    return value
+
+
+def _spectrum_file_key(spectrum_file):
+    """
+    Return (absolute path, modification time, size) of the spectrum file,
+    or spectrum_file itself if it is None or not an existing file.
+
+    Parameters
+    ==========
+
+    spectrum_file:              path to spectrum file
+
+    """
+    if spectrum_file is not None and os.path.isfile(spectrum_file):
+        file_stat = os.stat(spectrum_file)
+        return (os.path.abspath(spectrum_file), file_stat.st_mtime,
+                file_stat.st_size)
+    return spectrum_file
+
+
 def _get_spectrum(spectrum_file, range_, spectrum_step, design_energy):
+    """
+    Return spectrum (see _load_spectrum), from cache if the same input (and
+    unchanged spectrum file, by modification time and size) was already
+    loaded.
+
+    Parameters
+    ==========
+
+    spectrum_file:              path to spectrum file
+    range_ [keV, keV]:          [min, max]
+    spectrum_step [keV]
+    design_energy [keV]
+
+    Returns
+    =======
+
+    [spectrum, min, max]
+
+    Notes
+    =====
+
+    Cached energies and photons are read-only.
+
+    """
+    file_key = _spectrum_file_key(spectrum_file)
+    if range_ is not None:
+        range_key = tuple(range_)
+    else:
+        range_key = None
+    key = (file_key, range_key, spectrum_step, design_energy)
+
+    if key in _spectrum_cache:
+        logger.info("Spectrum unchanged, using previously loaded spectrum.")
+        [spectrum, min_energy, max_energy] = _spectrum_cache[key]
+        return dict(spectrum), min_energy, max_energy
+
+    [spectrum, min_energy, max_energy] = \
+        _load_spectrum(spectrum_file, range_, spectrum_step, design_energy)
+    for values in spectrum.values():
+        values.flags.writeable = False
+    if len(_spectrum_cache) >= _SPECTRUM_CACHE_SIZE:
+        _spectrum_cache.popitem(last=False)
+    _spectrum_cache[key] = [spectrum, min_energy, max_energy]
+    return dict(spectrum), min_energy, max_energy
+
+
+def _load_spectrum(spectrum_file, range_, spectrum_step, design_energy):
     """
     Load spectrum from file or define based on range (min, max). Returns
     energies and relative photons (normalized to 1 in total).
@@ -839,111 +789,118 @@ def _get_spectrum(spectrum_file, range_, spectrum_step, design_energy):
     if from file and range:
         range is set within loaded spectrum. Photons not rescaled.
     if range:
-        range from min to max, step 1 keV. Homogenuous photons distribution.
+        from min in steps of spectrum_step, up to max. If the range is not a
+        multiple of the step, the last energy is below max (warning).
+        Homogenuous photons distribution.
+    else:
+        only design energy (1 element arrays), photons 1.
 
     """
     # Read from file
     if spectrum_file is not None:
-        logger.info("Reading spectrum from file at:\n{}..."
-                    .format(spectrum_file))
+        logger.info("Reading spectrum from file at:\n%s...", spectrum_file)
         spectrum = _read_spectrum(spectrum_file)
         # Set range
         if range_ is not None:
             # Min and max in right order?
-            if range_[1] <= range_[0]:
-                error_message = ("Energy range maximum value ({0} keV) must "
-                                 "be larger than minimum value ({1} keV)."
-                                 .format(range_[0], range_[1]))
-                logger.error(error_message)
-                raise InputError(error_message)
-            # Check if within bounds of spectrum
-            if range_[0] >= max(spectrum['energies']):
-                error_message = ("Energy range minimum value must be smaller "
-                                 "than spectrum maximum ({0} keV)."
-                                 .format(max(spectrum['energies'])))
-                logger.error(error_message)
-                raise InputError(error_message)
-            if range_[1] <= min(spectrum['energies']):
-                error_message = ("Energy range maximum value must be larger "
-                                 "than spectrum minimum ({0} keV)."
-                                 .format(min(spectrum['energies'])))
-                logger.error(error_message)
-                raise InputError(error_message)
+            _check_range(range_)
+            # Check if within bounds of spectrum (energies sorted)
+            spectrum_min = spectrum['energies'][0]
+            spectrum_max = spectrum['energies'][-1]
+            if range_[0] >= spectrum_max:
+                _fail("Energy range minimum value must be smaller than "
+                      "spectrum maximum ({0} keV).", spectrum_max)
+            if range_[1] <= spectrum_min:
+                _fail("Energy range maximum value must be larger than "
+                      "spectrum minimum ({0} keV).", spectrum_min)
 
             # Find min and max closes to range min and max
-            [min_energy, min_index] = _nearest_value(spectrum['energies'],
-                                                     range_[0])
-            [max_energy, max_index] = _nearest_value(spectrum['energies'],
-                                                     range_[1])
+            [[min_energy, max_energy], [min_index, max_index]] = \
+                _nearest_value(spectrum['energies'], range_)
             # More than 1 energy in spectrum?
             if min_energy == max_energy:
-                error_message = ("Energy minimum value same as maximum. Range"
-                                 "minimum {0} and maximum {1} too close "
-                                 "together.".format(range_[0], range_[1]))
-                logger.error(error_message)
-                raise InputError(error_message)
+                _fail("Energy minimum value same as maximum. Range minimum "
+                      "{0} and maximum {1} too close together.", range_[0],
+                      range_[1])
             spectrum['energies'] = spectrum['energies'][min_index:max_index+1]
             spectrum['photons'] = spectrum['photons'][min_index:max_index+1]
-            logger.debug("\tSet energy range from {0} to {1} keV."
-                         .format(min_energy, max_energy))
+            logger.debug("\tSet energy range from %s to %s keV.",
+                         min_energy, max_energy)
         logger.info("... done.")
     # Check range input
     elif range_ is not None:
-        # Min and max in right order?
-        if range_[1] <= range_[0]+spectrum_step:
-            error_message = ("Energy range maximum value ({0} keV) must be "
-                             "at least {1} keV larger than minimum value "
-                             "({2} keV)."
-                             .format(range_[0], spectrum_step, range_[1]))
-            logger.error(error_message)
-            raise InputError(error_message)
+        # Min and max in right order (at least one step apart)?
+        _check_range(range_, spectrum_step)
         # Calc spectrum
         spectrum = dict()
         # Calc from range
         logger.info("Setting spectrum based on input range...")
-        spectrum['energies'] = np.arange(range_[0],
-                                         range_[1]+spectrum_step,
-                                         spectrum_step,
-                                         dtype=np.float)
-        spectrum['photons'] = (np.ones(len(spectrum['energies']),
-                                       dtype=np.float) /
-                               len(spectrum['energies']))
-        logger.debug("\tSet all photons to {}."
-                     .format(spectrum['photons'][0]))
+        # Number of full steps within range (tolerance for float division)
+        number_energies = \
+            int(np.floor((range_[1] - range_[0]) / spectrum_step + 1e-9)) + 1
+        spectrum['energies'] = range_[0] + \
+            spectrum_step * np.arange(number_energies, dtype=np.float64)
+        last_energy = spectrum['energies'][-1]
+        if range_[1] - last_energy > 1e-9 * spectrum_step:
+            logger.warning("Energy range ({0} to {1} keV) is not a multiple "
+                           "of the spectrum step ({2} keV), last energy is "
+                           "{3} keV.".format(range_[0], range_[1],
+                                             spectrum_step, last_energy))
+        spectrum['photons'] = np.full(number_energies, 1.0/number_energies,
+                                      dtype=np.float64)
+        logger.debug("\tSet all photons to %s.", spectrum['photons'][0])
         # Convert to struct
         logger.info("... done.")
     # Both spectrum_file and _range are None, use design energy as spectrum
     else:
-        logger.info("Only design energy specified, calculating only for {} "
-                    "keV...".format(design_energy))
+        logger.info("Only design energy specified, calculating only for %s "
+                    "keV...", design_energy)
         spectrum = dict()
-        spectrum['energies'] = np.array(design_energy, dtype=np.float)
-        spectrum['photons'] = np.array(1, dtype=np.float)
+        spectrum['energies'] = np.array([design_energy], dtype=np.float64)
+        spectrum['photons'] = np.array([1.0], dtype=np.float64)
         logger.debug("\tSet photons to 1.")
         logger.info("... done.")
-        logger.info("Spectrum is design energy {} keV."
-                    .format(spectrum['energies']))
-        return spectrum, spectrum['energies'], spectrum['energies']
 
-    # Check and show spectrum results
-    min_energy = min(spectrum['energies'])
-    max_energy = max(spectrum['energies'])
+    # Check and show spectrum results (energies sorted)
+    min_energy = spectrum['energies'][0]
+    max_energy = spectrum['energies'][-1]
     # Design energy in spectrum?
     if design_energy < min_energy or \
        design_energy > max_energy:
-        error_message = ("Design energy ({0} keV) must be within "
-                         "spectrum range (min: {1} kev, max: {2} keV).") \
-                         .format(design_energy,
-                                 min_energy, max_energy)
-        logger.error(error_message)
-        raise InputError(error_message)
+        _fail("Design energy ({0} keV) must be within spectrum range (min: "
+              "{1} keV, max: {2} keV).", design_energy, min_energy, max_energy)
     logger.debug("Design energy within spectrum.")
-    logger.info("Spectrum from {0} keV to {1} keV in {2} keV steps."
-                .format(min_energy, max_energy,
-                        spectrum['energies'][1]-spectrum['energies'][0]))
+    if len(spectrum['energies']) == 1:
+        logger.info("Spectrum is design energy %s keV.", min_energy)
+    else:
+        logger.info("Spectrum from %s keV to %s keV in %s keV steps.",
+                    min_energy, max_energy,
+                    spectrum['energies'][1]-spectrum['energies'][0])
     return spectrum, min_energy, max_energy
 
 
+def _check_range(range_, min_difference=0):
+    """
+    Check that energy range maximum is larger than minimum (by at least
+    min_difference).
+
+    Parameters
+    ==========
+
+    range_ [keV, keV]:          [min, max]
+    min_difference [keV]:       e.g. spectrum step
+
+    """
+    if range_[1] <= range_[0] + min_difference:
+        if min_difference:
+            _fail("Energy range maximum value ({0} keV) must be at least "
+                  "{1} keV larger than minimum value ({2} keV).", range_[1],
+                  min_difference, range_[0])
+        else:
+            _fail("Energy range maximum value ({0} keV) must be larger than "
+                  "minimum value ({1} keV).", range_[1], range_[0])
+
+
 def _read_spectrum(spectrum_file_path):
     """
     Read from spectrum file.
@@ -972,50 +929,84 @@ def _read_spectrum(spectrum_file_path):
 
     """
     # Read dict from file
-    logger.debug("Reading from file {}...".format(spectrum_file_path))
-    spectrum_struct_array = np.genfromtxt(spectrum_file_path, delimiter=',',
-                                          names=True)  # np ndarray
-    if 'energy' in spectrum_struct_array.dtype.names:
-        # Rename 'energy' to 'energies'
-        spectrum_struct_array.dtype.names = ('energies', 'photons')
-    # Convert to dict
+    logger.debug("Reading from file %s...", spectrum_file_path)
+    with open(spectrum_file_path) as spectrum_file:
+        # Column names from header
+        columns = [name.strip().lower()
+                   for name in spectrum_file.readline().split(',')]
+        try:
+            spectrum_array = np.loadtxt(spectrum_file, delimiter=',',
+                                        dtype=np.float64, ndmin=2)
+        except ValueError as e:
+            _fail("Spectrum file at {0} could not be read: {1}",
+                  spectrum_file_path, str(e))
+    # Convert to dict (contiguous copies of the columns)
     spectrum = dict()
-    try:
-        spectrum['energies'] = spectrum_struct_array['energies']
-        spectrum['photons'] = spectrum_struct_array['photons']
-    except AttributeError as e:
-        error_message = "Spectrum file at {0} is missing '{1}'-column." \
-                        .format(spectrum_file_path, str(e).split()[-1])
-        logger.error(error_message)
-        raise InputError(error_message)
+    for var_name, column_names in [['energies', ['energy', 'energies']],
+                                   ['photons', ['photons']]]:
+        column_index = [index for index, name in enumerate(columns)
+                        if name in column_names]
+        if not column_index:
+            _fail("Spectrum file at {0} is missing '{1}'-column.",
+                  spectrum_file_path, column_names[0])
+        spectrum[var_name] = \
+            np.ascontiguousarray(spectrum_array[:, column_index[0]])
 
     # Check if more than 2 energies in spectrum
     if len(spectrum['energies']) <= 1:
-                error_message = ("Spectrum file only contains 1 energy."
-                                 "Minimum is 2.")
-                logger.error(error_message)
-                raise InputError(error_message)
+        _fail("Spectrum file only contains 1 energy. Minimum is 2.")
+    # Check values
+    if not (np.isfinite(spectrum['energies']).all() and
+            np.isfinite(spectrum['photons']).all()):
+        _fail("Spectrum file at {0} contains NaN or infinite values.",
+              spectrum_file_path)
+    if (spectrum['photons'] < 0).any():
+        _fail("Spectrum file at {0} contains negative photons.",
+              spectrum_file_path)
+    # Sort by energy, if not already sorted (see _nearest_value)
+    energy_steps = np.diff(spectrum['energies'])
+    if (energy_steps < 0).any():
+        logger.debug("Sorting spectrum by energy.")
+        order = np.argsort(spectrum['energies'], kind='mergesort')
+        spectrum['energies'] = spectrum['energies'][order]
+        spectrum['photons'] = spectrum['photons'][order]
+        energy_steps = np.diff(spectrum['energies'])
+    if not energy_steps.all():
+        _fail("Spectrum file at {0} contains duplicate energies.",
+              spectrum_file_path)
     logger.debug("... done.")
     return spectrum
 
 
 def _nearest_value(array, value):
     """
-    Funtion to find the nearest value of a number within a numpy array.
+    Funtion to find the nearest value of a number within a sorted numpy
+    array.
 
     Parameters
     ==========
 
-    array [numpy array]     array to be searched
-    value                   target number
+    array [numpy array]     array to be searched, sorted (ascending) and with
+                            at least 2 values
+    value                   target number or array of target numbers
 
     Returns
     =======
 
-    [nearest_value, index]
+    [nearest_value, index]  same shape as value
+
+    Notes
+    =====
+
+    Binary search (np.searchsorted), then the closer of the two neighbours
+    is chosen. If both are equally close, the lower one is returned.
 
     """
-    nearest_index = (np.abs(array-value)).argmin()
+    value = np.asarray(value)
+    nearest_index = np.clip(np.searchsorted(array, value), 1, len(array)-1)
+    # Step back if left neighbour is closer (or equally close)
+    nearest_index -= (value - array[nearest_index-1]) <= \
+        (array[nearest_index] - value)
     return array[nearest_index], nearest_index
 
 
@@ -1076,362 +1067,267 @@ def _check_grating_input(grating, parameters, parser_info, geometry):
 
     """
     grating = grating.lower()
+    grating_name = grating.upper()
+    # Frequently used parameters
+    free_geometry = parameters['gi_geometry'] == 'free'
+    dual_phase = parameters['dual_phase']
+    design_energy = parameters['design_energy']
+    photo_only = parameters['photo_only']
+    look_up_table = parameters['look_up_table']
+    # Parameter keys of grating
+    keys = dict((var_name, var_name + '_' + grating)
+                for var_name in ['type', 'pitch', 'duty_cycle', 'material',
+                                 'thickness', 'phase_shift', 'radius',
+                                 'wafer_material', 'wafer_thickness',
+                                 'fill_material', 'fill_thickness'])
+    keys['bent'] = grating + '_bent'
+    keys['matching'] = grating + '_matching'
+
     # Is defined?
-    if not parameters['type_'+grating]:
-        error_message = ("Type of {0} ({1}) not defined."
-                         .format(grating.upper(),
-                                 parser_info['type_'+grating][0]))
-        logger.error(error_message)
-        raise InputError(error_message)
+    if not parameters[keys['type']]:
+        _fail("Type of {0} ({1}) not defined.", grating_name,
+              parser_info[keys['type']][0])
 
     # Check grating types for GI setups (optional for geometry calc)
-    if parameters['gi_geometry'] != 'free' and not geometry:
-        # G0 (abs or mix)
-        if grating == 'g0' and parameters['type_'+grating] == 'phase':
-            error_message = ("Type of G0 ({0}) must be 'mix' or 'abs'."
-                             .format(parser_info['type_'+grating][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
-        # G1 (phase or mix)
-        if grating == 'g1' and parameters['type_'+grating] == 'abs':
-            error_message = ("Type of G1 ({0}) must be 'mix' or 'phase'."
-                             .format(parser_info['type_'+grating][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
-        # G2 (abs or mix for classic GI, phase or mix for dual phase)
-        if grating == 'g2' and not parameters['dual_phase'] and \
-                parameters['type_'+grating] == 'phase':
-            error_message = ("Type of G2 ({0}) must be 'mix' or 'abs'."
-                             .format(parser_info['type_'+grating][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
-        elif grating == 'g2' and parameters['dual_phase'] and \
-                parameters['type_'+grating] == 'abs':
-            error_message = ("Type of G2 ({0}) must be 'mix' or 'phase'."
-                             .format(parser_info['type_'+grating][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
+    if not free_geometry and not geometry:
+        allowed_types = _ALLOWED_GRATING_TYPES[grating, bool(dual_phase)]
+        if parameters[keys['type']] not in allowed_types:
+            _fail("Type of {0} ({1}) must be '{2}' or '{3}'.", grating_name,
+                  parser_info[keys['type']][0], allowed_types[0],
+                  allowed_types[1])
 
     # Basic required input (except G2 and dual phase)
     # If fixed grating (for none-free input) or free input
-    if ((parameters['gi_geometry'] != 'free' and
-            grating == parameters['fixed_grating']) or
-            parameters['gi_geometry'] == 'free') and not \
-            (parameters['dual_phase'] and grating == 'g2'):
-        if not parameters['pitch_'+grating]:
-            error_message = ("Pitch of {0} ({1}) must be defined."
-                             .format(grating.upper(),
-                                     parser_info['pitch_'+grating][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
-        if not parameters['duty_cycle_'+grating]:
-            error_message = ("Duty cycle of {0} ({1}) must be defined."
-                             .format(grating.upper(),
-                                     parser_info['duty_cycle_'+grating][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
-        elif parameters['duty_cycle_'+grating] <= 0 or \
-                parameters['duty_cycle_'+grating] >= 1:
-            error_message = ("Duty cycle of {0} ({1}) must be within ]0...1[."
-                             .format(grating.upper(),
-                                     parser_info['duty_cycle_'+grating][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
+    if (free_geometry or grating == parameters['fixed_grating']) and not \
+            (dual_phase and grating == 'g2'):
+        if not parameters[keys['pitch']]:
+            _fail("Pitch of {0} ({1}) must be defined.", grating_name,
+                  parser_info[keys['pitch']][0])
+        if not parameters[keys['duty_cycle']]:
+            _fail("Duty cycle of {0} ({1}) must be defined.", grating_name,
+                  parser_info[keys['duty_cycle']][0])
+        elif parameters[keys['duty_cycle']] <= 0 or \
+                parameters[keys['duty_cycle']] >= 1:
+            _fail("Duty cycle of {0} ({1}) must be within ]0...1[.",
+                  grating_name, parser_info[keys['duty_cycle']][0])
 
     # Phase and/or thickness and/or absorption
-    if parameters['type_'+grating] == 'abs':
+    if parameters[keys['type']] == 'abs':
         # Absorption grating
-        if not parameters['thickness_'+grating]:
-            error_message = ("Thickness of {0} ({1}) must be defined."
-                             .format(grating.upper(),
-                                     parser_info['thickness_'+grating][0]))
-            logger.error(error_message)
-            raise InputError(error_message)
-        if parameters['phase_shift_'+grating]:
+        if not parameters[keys['thickness']]:
+            _fail("Thickness of {0} ({1}) must be defined.", grating_name,
+                  parser_info[keys['thickness']][0])
+        if parameters[keys['phase_shift']]:
             warning_message = ("Phase shift of {0} is defined, but ignored."
-                               .format(grating.upper()))
+                               .format(grating_name))
             logger.warn(warning_message)
-            parameters['phase_shift_'+grating] = None
-    elif parameters['type_'+grating] == 'phase':
+            parameters[keys['phase_shift']] = None
+    elif parameters[keys['type']] == 'phase':
         # Phase grating
-        if parameters['gi_geometry'] == 'free':
+        if free_geometry:
             # Free input
-            if not parameters['thickness_'+grating] and \
-                    not parameters['phase_shift_'+grating]:
+            if not parameters[keys['thickness']] and \
+                    not parameters[keys['phase_shift']]:
                 # Nothing defined
-                error_message = ("Thickness ({0}) OR phase shift ({1}) of {2} "
-                                 "must be defined."
-                                 .format(parser_info['thickness_'+grating][0],
-                                         parser_info['phase_shift_'+grating]
-                                         [0],
-                                         grating.upper()))
-                logger.error(error_message)
-                raise InputError(error_message)
-            if parameters['phase_shift_'+grating]:
+                _fail("Thickness ({0}) OR phase shift ({1}) of {2} must be "
+                      "defined.", parser_info[keys['thickness']][0],
+                      parser_info[keys['phase_shift']][0], grating_name)
+            if parameters[keys['phase_shift']]:
                 # Phase defined
-                if parameters['thickness_'+grating]:
+                if parameters[keys['thickness']]:
                     # Thickness as well
                     warning_message = ("Thickness AND phase shift of {0} are "
                                        "defined. Basing calculations on phase "
-                                       "shift.".format(grating.upper()))
+                                       "shift.".format(grating_name))
                     logger.warn(warning_message)
                 # Calc thickness
                 if not geometry:
-                    parameters['thickness_'+grating] = \
+                    parameters[keys['thickness']] = \
                         materials.shift_to_height(parameters
-                                                  ['phase_shift_'+grating],
-                                                  parameters
-                                                  ['material_'+grating],
-                                                  parameters['design_energy'],
-                                                  photo_only=
-                                                  parameters['photo_only'],
-                                                  source=
-                                                  parameters['look_up_table'])
+                                                  [keys['phase_shift']],
+                                                  parameters[keys['material']],
+                                                  design_energy,
+                                                  photo_only=photo_only,
+                                                  source=look_up_table)
             else:
                 # Phase not defined, but thickness
                 # Calc phase shift
                 if not geometry:
-                    parameters['phase_shift_'+grating] = \
+                    parameters[keys['phase_shift']] = \
                         materials.height_to_shift(parameters
-                                                  ['thickness_'+grating],
-                                                  parameters
-                                                  ['material_'+grating],
-                                                  parameters['design_energy'],
-                                                  photo_only=
-                                                  parameters['photo_only'],
-                                                  source=
-                                                  parameters['look_up_table'])
+                                                  [keys['thickness']],
+                                                  parameters[keys['material']],
+                                                  design_energy,
+                                                  photo_only=photo_only,
+                                                  source=look_up_table)
         else:
             # GI setup
             # Either phase G1 (normal and dual phase) or
             # phase G2 (for dual phase)
-            if not parameters['phase_shift_'+grating]:
-                if parameters['dual_phase']:
-                    error_message = ("Phase shift ({0}) of {1} "
-                                     "must be defined."
-                                     .format(parser_info['phase_shift_' +
-                                                         grating][0],
-                                             grating.upper()))
+            if not parameters[keys['phase_shift']]:
+                if dual_phase:
+                    _fail("Phase shift ({0}) of {1} must be defined.",
+                          parser_info[keys['phase_shift']][0],
+                          grating_name)
                 else:
-                    error_message = ("Phase shift ({0}) of {1} "
-                                     "must be defined as pi or pi/2."
-                                     .format(parser_info['phase_shift_' +
-                                                         grating][0],
-                                             grating.upper()))
-                logger.error(error_message)
-                raise InputError(error_message)
-
-            if (not parameters['dual_phase'] and
-                not((round(parameters['phase_shift_'+grating] - np.pi) == 0) or
-                   (round(parameters['phase_shift_'+grating] - np.pi/2) == 0))):
-                error_message = ("Phase shift ({0}) of {1} must be 'pi' or "
-                                 "'pi/2'."
-                                 .format(parser_info['phase_shift_'+grating]
-                                         [0],
-                                         grating.upper()))
-                logger.error(error_message)
-                raise InputError(error_message)
-
-            if parameters['thickness_'+grating] and \
-                    parameters['phase_shift_'+grating]:
+                    _fail("Phase shift ({0}) of {1} must be defined as pi or "
+                          "pi/2.", parser_info[keys['phase_shift']][0],
+                          grating_name)
+
+            if (not dual_phase and
+                not((round(parameters[keys['phase_shift']] - np.pi) == 0) or
+                   (round(parameters[keys['phase_shift']] - np.pi/2) == 0))):
+                _fail("Phase shift ({0}) of {1} must be 'pi' or 'pi/2'.",
+                      parser_info[keys['phase_shift']][0], grating_name)
+
+            if parameters[keys['thickness']] and \
+                    parameters[keys['phase_shift']]:
                 warning_message = ("Thickness AND phase shift of {0} are "
                                    "defined. Basing calculations on phase "
-                                   "shift.".format(grating.upper()))
+                                   "shift.".format(grating_name))
                 logger.warn(warning_message)
             # Calc thickness
             if not geometry:
-                parameters['thickness_'+grating] = \
-                    materials.shift_to_height(parameters['phase_shift_' +
-                                                         grating],
-                                              parameters['material_'+grating],
-                                              parameters['design_energy'],
-                                              photo_only=
-                                              parameters['photo_only'],
-                                              source=
-                                              parameters['look_up_table'])
+                parameters[keys['thickness']] = \
+                    materials.shift_to_height(parameters[keys['phase_shift']],
+                                              parameters[keys['material']],
+                                              design_energy,
+                                              photo_only=photo_only,
+                                              source=look_up_table)
     else:
         # Mix grating
-        if parameters['gi_geometry'] == 'free':
+        if free_geometry:
             # Free input
-            if not parameters['thickness_'+grating] and \
-                    not parameters['phase_shift_'+grating]:
+            if not parameters[keys['thickness']] and \
+                    not parameters[keys['phase_shift']]:
                 # Nothing defined
-                error_message = ("Thickness ({0}) OR phase shift ({1}) of {2} "
-                                 "must be defined."
-                                 .format(parser_info['thickness_'+grating][0],
-                                         parser_info['phase_shift_'+grating]
-                                         [0],
-                                         grating.upper()))
-                logger.error(error_message)
-                raise InputError(error_message)
-            if parameters['thickness_'+grating]:
+                _fail("Thickness ({0}) OR phase shift ({1}) of {2} must be "
+                      "defined.", parser_info[keys['thickness']][0],
+                      parser_info[keys['phase_shift']][0], grating_name)
+            if parameters[keys['thickness']]:
                 # Thickness defined
-                if parameters['phase_shift_'+grating]:
+                if parameters[keys['phase_shift']]:
                     # Phase as well
                     warning_message = ("Thickness AND phase shift of {0} are "
                                        "defined. Basing calculations on "
-                                       "thickness.".format(grating.upper()))
+                                       "thickness.".format(grating_name))
                     logger.warn(warning_message)
                 # Calc phase shift
                 if not geometry:
-                    parameters['phase_shift_'+grating] = \
+                    parameters[keys['phase_shift']] = \
                         materials.height_to_shift(parameters
-                                                  ['thickness_'+grating],
-                                                  parameters
-                                                  ['material_'+grating],
-                                                  parameters['design_energy'],
-                                                  photo_only=
-                                                  parameters['photo_only'],
-                                                  source=
-                                                  parameters['look_up_table'])
+                                                  [keys['thickness']],
+                                                  parameters[keys['material']],
+                                                  design_energy,
+                                                  photo_only=photo_only,
+                                                  source=look_up_table)
             else:
                 # Phase shift defined
                 # Calc thickness
                 if not geometry:
-                    parameters['thickness_'+grating] = \
+                    parameters[keys['thickness']] = \
                         materials.shift_to_height(parameters
-                                                  ['phase_shift_'+grating],
-                                                  parameters['material_' +
-                                                             grating],
-                                                  parameters['design_energy'],
-                                                  photo_only=
-                                                  parameters['photo_only'],
-                                                  source=
-                                                  parameters['look_up_table'])
+                                                  [keys['phase_shift']],
+                                                  parameters[keys['material']],
+                                                  design_energy,
+                                                  photo_only=photo_only,
+                                                  source=look_up_table)
         else:
             # GI setup
             if grating == 'g0' or (grating == 'g2' and
-                                   not parameters['dual_phase']):
+                                   not dual_phase):
                 # For G0 or G2 if not dual_phase
-                if not parameters['thickness_'+grating]:
+                if not parameters[keys['thickness']]:
                     # Thickness not defined
-                    error_message = ("Thickness ({0}) of {1} "
-                                     "must be defined."
-                                     .format(parser_info['thickness_'+grating]
-                                             [0],
-                                             grating.upper()))
-                    logger.error(error_message)
-                    raise InputError(error_message)
-                if parameters['phase_shift_'+grating]:
+                    _fail("Thickness ({0}) of {1} must be defined.",
+                          parser_info[keys['thickness']][0],
+                          grating_name)
+                if parameters[keys['phase_shift']]:
                     # Phase as well
                     warning_message = ("Thickness AND phase shift of {0} are "
                                        "defined. Basing calculations on "
-                                       "thickness.".format(grating.upper()))
+                                       "thickness.".format(grating_name))
                     logger.warn(warning_message)
                 # Calc phase shift
                 if not geometry:
-                    parameters['phase_shift_'+grating] = \
+                    parameters[keys['phase_shift']] = \
                         materials.height_to_shift(parameters
-                                                  ['thickness_'+grating],
-                                                  parameters
-                                                  ['material_'+grating],
-                                                  parameters['design_energy'],
-                                                  photo_only=
-                                                  parameters['photo_only'],
-                                                  source=
-                                                  parameters['look_up_table'])
+                                                  [keys['thickness']],
+                                                  parameters[keys['material']],
+                                                  design_energy,
+                                                  photo_only=photo_only,
+                                                  source=look_up_table)
             else:
                 # G1 (normal and dual phase) or G2 if dual phase
-                if not parameters['phase_shift_'+grating]:
-                    error_message = ("Phase shift ({0}) of {1} "
-                                     "must be defined."
-                                     .format(parser_info
-                                             ['phase_shift_'+grating][0],
-                                             grating.upper()))
-                    logger.error(error_message)
-                    raise InputError(error_message)
-                if parameters['phase_shift_'+grating]:
+                if not parameters[keys['phase_shift']]:
+                    _fail("Phase shift ({0}) of {1} must be defined.",
+                          parser_info[keys['phase_shift']][0],
+                          grating_name)
+                if parameters[keys['phase_shift']]:
                     # Phase as well
                     warning_message = ("Thickness AND phase shift of {0} are "
                                        "defined. Basing calculations on "
-                                       "thickness.".format(grating.upper()))
+                                       "thickness.".format(grating_name))
                     logger.warn(warning_message)
                 # Calc thickness
                 if not geometry:
-                    parameters['thickness_'+grating] = \
+                    parameters[keys['thickness']] = \
                         materials.shift_to_height(parameters
-                                                  ['phase_shift_'+grating],
-                                                  parameters['material_' +
-                                                             grating],
-                                                  parameters['design_energy'],
-                                                  photo_only=
-                                                  parameters['photo_only'],
-                                                  source=
-                                                  parameters['look_up_table'])
+                                                  [keys['phase_shift']],
+                                                  parameters[keys['material']],
+                                                  design_energy,
+                                                  photo_only=photo_only,
+                                                  source=look_up_table)
 
     # Optional input if not geometry check
     # Always required
-    if not parameters['material_'+grating] and not geometry:
-        error_message = ("Material of {0} ({1}) must be defined."
-                         .format(grating.upper(),
-                                 parser_info['material_'+grating][0]))
-        logger.error(error_message)
-        raise InputError(error_message)
+    if not parameters[keys['material']] and not geometry:
+        _fail("Material of {0} ({1}) must be defined.", grating_name,
+              parser_info[keys['material']][0])
 
     # Optional input
-    # Wafer
-    if parameters['wafer_thickness_'+grating] and \
-            not parameters['wafer_material_'+grating]:
-        error_message = ("Wafer material of {0} ({1}) must be specified."
-                         .format(grating.upper(),
-                                 parser_info['wafer_material_'+grating][0]))
-        logger.error(error_message)
-        raise InputError(error_message)
-    if parameters['wafer_material_'+grating] and \
-            not parameters['wafer_thickness_'+grating]:
-        error_message = ("Wafer thickness of {0} ({1}) must be specified."
-                         .format(grating.upper(),
-                                 parser_info['wafer_thickness_'+grating][0]))
-        logger.error(error_message)
-        raise InputError(error_message)
-    # Grating fill
-    if parameters['fill_thickness_'+grating] and \
-            not parameters['fill_material_'+grating]:
-        error_message = ("Fill material of {0} ({1}) must be specified."
-                         .format(grating.upper(),
-                                 parser_info['fill_material_'+grating][0]))
-        logger.error(error_message)
-        raise InputError(error_message)
-    if parameters['fill_material_'+grating] and \
-            not parameters['fill_thickness_'+grating]:
-        error_message = ("Fill thickness of {0} ({1}) must be specified."
-                         .format(grating.upper(),
-                                 parser_info['fill_thickness_'+grating][0]))
-        logger.error(error_message)
-        raise InputError(error_message)
+    # Wafer and grating fill
+    for layer in ['wafer', 'fill']:
+        thickness = keys[layer + '_thickness']
+        material = keys[layer + '_material']
+        if parameters[thickness] and not parameters[material]:
+            _fail("{0} material of {1} ({2}) must be specified.",
+                  layer.capitalize(), grating_name,
+                  parser_info[material][0])
+        if parameters[material] and not parameters[thickness]:
+            _fail("{0} thickness of {1} ({2}) must be specified.",
+                  layer.capitalize(), grating_name,
+                  parser_info[thickness][0])
 
     # Shape of grating
-    if parameters[grating+'_bent']:
+    if parameters[keys['bent']]:
         if parameters['beam_geometry'] == 'parallel':
             warning_message = ("{0} is bent in a parallel beam geometry. "
                                "Ignoring bent grating parameters..."
-                               .format(grating.upper()))
+                               .format(grating_name))
             logger.warning(warning_message)
-            parameters[grating+'_bent'] = False
-            parameters['radius_'+grating] = None
-            parameters[grating+'_matching'] = False
-        elif parameters[grating+'_matching'] and parameters['radius_'+grating]:
+            parameters[keys['bent']] = False
+            parameters[keys['radius']] = None
+            parameters[keys['matching']] = False
+        elif parameters[keys['matching']] and parameters[keys['radius']]:
             warning_message = ("{0} is bent with matching radius AND a radius "
                                "is set. Ignoring set radius..."
-                               .format(grating.upper()))
+                               .format(grating_name))
             logger.warning(warning_message)
-            parameters['radius_'+grating] = None
-        elif not parameters[grating+'_matching'] and \
-                not parameters['radius_'+grating]:
-            error_message = ("Radius of bent {0} is required."
-                             .format(grating.upper()))
-            logger.error(error_message)
-            raise InputError(error_message)
+            parameters[keys['radius']] = None
+        elif not parameters[keys['matching']] and \
+                not parameters[keys['radius']]:
+            _fail("Radius of bent {0} is required.", grating_name)
     else:
-        if parameters[grating+'_matching']:
+        if parameters[keys['matching']]:
             warning_message = ("{0} is straight and cannot match its distance "
                                "from source. Ignoring matching flag..."
-                               .format(grating.upper()))
+                               .format(grating_name))
             logger.warning(warning_message)
-            parameters[grating+'_matching'] = False
-        if parameters['radius_'+grating]:
+            parameters[keys['matching']] = False
+        if parameters[keys['radius']]:
             warning_message = ("{0} is straight and does not have a radius. "
                                "gnoring set radius..."
-                               .format(grating.upper()))
+                               .format(grating_name))
             logger.warning(warning_message)
-            parameters['radius_'+grating] = None
\ No newline at end of file
+            parameters[keys['radius']] = None
\ No newline at end of file
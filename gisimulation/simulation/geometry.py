@@ -7,10 +7,16 @@ ToDo:
 
 @author: buechner_m <maria.buechner@gmail.com>
 """
-import numpy as np
+import math
 import logging
 logger = logging.getLogger(__name__)
 
+# Invalid fixed distance of cone beam setups (see Geometry._calc_cone)
+_DISTANCE_TOO_SMALL = ("{0} too small for chosen talbot order, energy and "
+                       "pitch of G1. Must be larger than: {1} mm")
+_DISTANCE_TOO_LARGE = ("{0} too large for chosen talbot order, energy and "
+                       "pitch of G1. Must be smaller than: {1} mm")
+
 
 class GeometryError(Exception):
     """
@@ -19,7 +25,7 @@ class GeometryError(Exception):
     pass
 
 
-class Geometry():
+class Geometry(object):
     """
     Class to calculate and set all missing geometry and GI parameters.
 
@@ -30,6 +36,26 @@ class Geometry():
     parameters. Returns self._parameters with .update_parameters().
 
     """
+    __slots__ = ('_parameters', '_nu', '_has_g0', '_has_sample', 'results')
+    # Calculation method per GI geometry (nothing to calculate if 'free')
+    _CALCULATIONS = {
+        'conv': '_calc_conventional',
+        'sym': '_calc_symmetrical',
+        'inv': '_calc_inverse'
+    }
+    # Parameter keys added to results (see _get_geometry_results)
+    _DISTANCE_KEYS = frozenset([
+        'distance_source_g0', 'distance_source_g1', 'distance_source_g2',
+        'distance_source_sample', 'distance_source_detector',
+        'distance_g0_g1', 'distance_g0_g2', 'distance_g0_detector',
+        'distance_g1_g2', 'distance_g1_detector', 'distance_g2_detector'
+    ])
+    _PITCH_KEYS = frozenset(['pitch_g0', 'pitch_g1', 'pitch_g2',
+                             'pitch_fringe'])
+    _DUTY_CYCLE_KEYS = frozenset(['duty_cycle_g0', 'duty_cycle_g1',
+                                  'duty_cycle_g2', 'duty_cycle_fringe'])
+    _RADIUS_KEYS = frozenset(['radius_g0', 'radius_g1', 'radius_g2'])
+
     def __init__(self, parameters):
         """
         Calculates the geometries and missing GI parameters.
@@ -41,24 +67,22 @@ class Geometry():
 
         """
         self._parameters = parameters.copy()
-
-        if self._parameters['gi_geometry'] != 'free':
-            # nu = 2 if pi shift, nu = 1 if pi-half shift
-            self._nu = round(self._parameters['phase_shift_g1'] * 2/np.pi)
-            logger.debug("self._nu: {0}".format(self._nu))
+        component_list = self._parameters['component_list']
+        self._has_g0 = 'G0' in component_list
+        self._has_sample = 'Sample' in component_list
 
         # Calculate geometries
-        if self._parameters['gi_geometry'] == 'conv':
-            self._calc_conventional()
-        elif self._parameters['gi_geometry'] == 'sym':
-            self._calc_symmetrical()
-        elif self._parameters['gi_geometry'] == 'inv':
-            self._calc_inverse()
+        calculation = self._CALCULATIONS.get(self._parameters['gi_geometry'])
+        if calculation is not None:
+            # nu = 2 if pi shift, nu = 1 if pi-half shift
+            self._nu = round(self._parameters['phase_shift_g1'] * 2/math.pi)
+            logger.debug("self._nu: %s", self._nu)
+            getattr(self, calculation)()
 
         # Update source to component distances and grating radii if bent
         self._update_distances()
 
-        if 'Sample' in self._parameters['component_list']:
+        if self._has_sample:
             self._check_sample_position()
 
         # Update geometry results
@@ -127,387 +151,58 @@ class Geometry():
 
         """
         logger.info("Calculating conventional setup...")
-        if self._parameters['beam_geometry'] == 'parallel':
+        p = self._parameters
+        nu = self._nu
+        talbot_order = p['talbot_order']
+        design_wavelength = p['design_wavelength']  # [um]
+        if p['beam_geometry'] == 'parallel':
             # Parallel beam
-            if not self._parameters['dual_phase']:
+            if not p['dual_phase']:
                 # Standard GI
-                if self._parameters['fixed_grating'] == 'g1':
-                    # Talbot distance
-                    self._parameters['distance_g1_g2'] = \
-                        self._parameters['talbot_order'] * \
-                        (np.square(self._parameters['pitch_g1'] / self._nu) /
-                         (2 * self._parameters['design_wavelength']))  # [um]
-                    self._parameters['distance_g1_g2'] = \
-                        self._parameters['distance_g1_g2'] * 1e-3  # [mm]
+                if p['fixed_grating'] == 'g1':
                     # Pitches
-                    self._parameters['pitch_g2'] = \
-                        self._parameters['pitch_g1'] / self._nu
+                    pitch_g1 = p['pitch_g1']
+                    p['pitch_g2'] = pitch_g1 / nu
                     # Duty cycles
-                    self._parameters['duty_cycle_g2'] = \
-                        self._parameters['duty_cycle_g1']
+                    self._propagate_duty_cycles('g1')
                 else:
                     # Pitches
-                    self._parameters['pitch_g1'] = \
-                        self._parameters['pitch_g2'] * self._nu
+                    pitch_g1 = p['pitch_g2'] * nu
+                    p['pitch_g1'] = pitch_g1
                     # Duty cycles
-                    self._parameters['duty_cycle_g1'] = \
-                        self._parameters['duty_cycle_g2']
-                    # Talbot distance
-                    self._parameters['distance_g1_g2'] = \
-                        self._parameters['talbot_order'] * \
-                        (np.square(self._parameters['pitch_g1'] / self._nu) /
-                         (2 * self._parameters['design_wavelength']))  # [um]
-                    self._parameters['distance_g1_g2'] = \
-                        self._parameters['distance_g1_g2'] * 1e-3  # [mm]
+                    self._propagate_duty_cycles('g2')
+                # Talbot distance
+                p['distance_g1_g2'] = _talbot_distance(
+                    pitch_g1, nu, talbot_order, design_wavelength)  # [mm]
         else:
             # Cone beam
-            if not self._parameters['dual_phase']:
-                if self._parameters['fixed_grating'] == 'g1':
-                    # G1 fixed
-                    # Talbot distance (Dn)
-                    talbot_distance = self._parameters['talbot_order'] * \
-                        (np.square(self._parameters['pitch_g1'] / self._nu) /
-                         (2 * self._parameters['design_wavelength']))  # [um]
-                    talbot_distance = talbot_distance * 1e-3  # [mm]
-
-                    # Other distances
-                    if self._parameters['fixed_distance'] == \
-                            'distance_source_g1' or \
-                            self._parameters['fixed_distance'] == \
-                            'distance_g0_g1':
-                        # Distance from Source/G0 to G1 fixed (l)
-                        to_g1 = self._parameters[self._parameters
-                                                 ['fixed_distance']]  # [mm]
-
-                        # G1 to G2 (dn)
-                        self._parameters['distance_g1_g2'] = \
-                            to_g1 * talbot_distance / \
-                            (to_g1 - talbot_distance)
-
-                        # Check if valid distance input
-                        if self._parameters['distance_g1_g2'] <= 0:
-                            error_message = ("{0} too small for chosen talbot "
-                                             "order, energy and pitch of G1. "
-                                             "Must be larger than: {1} mm"
-                                             .format(self._parameters
-                                                     ['fixed_distance'],
-                                                     talbot_distance))
-                            logger.error(error_message)
-                            raise GeometryError(error_message)
-                        elif self._parameters['distance_g1_g2'] >= to_g1:
-                            error_message = ("{0} too small for chosen talbot "
-                                             "order, energy and pitch of G1. "
-                                             "Must be larger than: {1} mm"
-                                             .format(self._parameters
-                                                     ['fixed_distance'],
-                                                     self._parameters
-                                                     ['distance_g1_g2']))
-                            logger.error(error_message)
-                            raise GeometryError(error_message)
-
-                        # Source/G0 to G2 (s)
-                        total_length = to_g1 + \
-                            self._parameters['distance_g1_g2']
-                        if 'G0' in self._parameters['component_list']:
-                            self._parameters['distance_g0_g2'] = total_length
-                        else:
-                            self._parameters['distance_source_g2'] = \
-                                total_length
-
-                    elif self._parameters['fixed_distance'] == \
-                            'distance_source_g2' or \
-                            self._parameters['fixed_distance'] == \
-                            'distance_g0_g2':
-                        # Distance from Source/G0 to G2 fixed (s)
-                        total_length = self._parameters[self._parameters
-                                                        ['fixed_distance']]
-
-                        # Source/G0 to G1 (l)
-                        # Checks ultimately if s> 2*dn:
-                        if total_length <= 4.0 * talbot_distance:
-                            error_message = ("{0} too small for chosen talbot "
-                                             "order, energy and pitch of G1. "
-                                             "Must be larger than: {1} mm"
-                                             .format(self._parameters
-                                                     ['fixed_distance'],
-                                                     4.0 * talbot_distance))
-                            logger.error(error_message)
-                            raise GeometryError(error_message)
-
-                        to_g1 = total_length/2.0 + np.sqrt(total_length**2.0 /
-                                                           4.0 - total_length *
-                                                           talbot_distance)
-
-                        if 'G0' in self._parameters['component_list']:
-                            self._parameters['distance_g0_g1'] = to_g1
-                        else:
-                            self._parameters['distance_source_g1'] = to_g1
-
-                        # G1 to G2 (dn)
-                        self._parameters['distance_g1_g2'] = \
-                            to_g1 * talbot_distance / \
-                            (to_g1 - talbot_distance)
-
-                    # Magnification (s/l)
-                    M = total_length / to_g1
-
-                    # Pitches
-                    self._parameters['pitch_g2'] = \
-                        M * self._parameters['pitch_g1'] / self._nu
-                    if 'G0' in self._parameters['component_list']:
-                        self._parameters['pitch_g0'] = \
-                            (to_g1 / self._parameters['distance_g1_g2']) * \
-                            self._parameters['pitch_g2']
-
-                    # Duty cycles
-                    self._parameters['duty_cycle_g2'] = \
-                        self._parameters['duty_cycle_g1']
-                    if 'G0' in self._parameters['component_list']:
-                        self._parameters['duty_cycle_g0'] = \
-                            self._parameters['duty_cycle_g1']
-
-                elif self._parameters['fixed_grating'] == 'g2':
-                    # G2 fixed
-                    if self._parameters['fixed_distance'] == \
-                            'distance_source_g1' or \
-                            self._parameters['fixed_distance'] == \
-                            'distance_g0_g1':
-                        # Distance from Source/G0 to G1 fixed (l)
-                        to_g1 = self._parameters[self._parameters
-                                                 ['fixed_distance']]  # [mm]
-
-                        # distance from G1 to G2 (dn)
-                        # dn = -05*l + sqrt(0.25*l^2 + n/(2*lambda)*p2^2*l)
-                        # lambda and p2 in um, need to be in mm
-                        wavelength = self._parameters['design_wavelength'] * \
-                            1e-3  # [mm]
-                        p2 = self._parameters['pitch_g2'] * 1e-3  # [mm]
-
-                        self._parameters['distance_g1_g2'] = -0.5 * to_g1 + \
-                            np.sqrt(0.25 * to_g1**2 +
-                                    self._parameters['talbot_order'] *
-                                    p2**2 * to_g1 / (2 * wavelength))  # [mm]
-
-                        # Check if l > dn:
-                        if self._parameters['distance_g1_g2'] >= to_g1:
-                            error_message = ("{0} too small for chosen talbot "
-                                             "order, energy and pitch of G1. "
-                                             "Must be larger than: {1} mm"
-                                             .format(self._parameters
-                                                     ['fixed_distance'],
-                                                     self._parameters
-                                                     ['distance_g1_g2']))
-                            logger.error(error_message)
-                            raise GeometryError(error_message)
-
-                        # Distance from Source/G0 to G2 fixed (s)
-                        total_length = self._parameters['distance_g1_g2'] + \
-                            to_g1  # [mm]
-
-                        # Source/G0 to G2 (s)
-                        total_length = to_g1 + \
-                            self._parameters['distance_g1_g2']
-                        if 'G0' in self._parameters['component_list']:
-                            self._parameters['distance_g0_g2'] = total_length
-                        else:
-                            self._parameters['distance_source_g2'] = \
-                                total_length
-
-                    elif self._parameters['fixed_distance'] == \
-                            'distance_source_g2' or \
-                            self._parameters['fixed_distance'] == \
-                            'distance_g0_g2':
-                        # Distance from Source/G0 to G2 fixed (s)
-                        total_length = self._parameters[self._parameters
-                                                        ['fixed_distance']]
-
-                        # distance from G1 to G2 (dn)
-                        # dn = s / (s * 2 * lambda / (n * p2^2) + 1)
-                        # lambda and p2 in um, need to be in mm
-                        wavelength = self._parameters['design_wavelength'] * \
-                            1e-3  # [mm]
-                        p2 = self._parameters['pitch_g2'] * 1e-3  # [mm]
-
-                        self._parameters['distance_g1_g2'] = total_length / \
-                            (total_length * 2 * wavelength /
-                             (self._parameters['talbot_order'] * p2**2) + 1)  # [mm]
-
-                        # Distance from Source/G0 to G1 fixed (l)
-                        to_g1 = total_length - \
-                            self._parameters['distance_g1_g2']  # [mm]
-
-                        # Check if l > dn:
-                        if self._parameters['distance_g1_g2'] >= to_g1:
-                            error_message = ("{0} too small for chosen talbot "
-                                             "order, energy and pitch of G1. "
-                                             "Must be larger than: {1} mm"
-                                             .format(self._parameters
-                                                     ['fixed_distance'],
-                                                     self._parameters
-                                                     ['distance_g1_g2']))
-                            logger.error(error_message)
-                            raise GeometryError(error_message)
-
-                        if 'G0' in self._parameters['component_list']:
-                            self._parameters['distance_g0_g1'] = to_g1
-                        else:
-                            self._parameters['distance_source_g1'] = to_g1
-
-                    # Magnification (s/l)
-                    M = total_length / to_g1
-
-                    # Pitches [um]
-                    self._parameters['pitch_g1'] = \
-                        self._nu * self._parameters['pitch_g2'] / M
-                    if 'G0' in self._parameters['component_list']:
-                        self._parameters['pitch_g0'] = \
-                            (to_g1 / self._parameters['distance_g1_g2']) * \
-                            self._parameters['pitch_g2']
-
-                    # Duty cycles
-                    self._parameters['duty_cycle_g1'] = \
-                        self._parameters['duty_cycle_g2']
-                    if 'G0' in self._parameters['component_list']:
-                        self._parameters['duty_cycle_g0'] = \
-                            self._parameters['duty_cycle_g2']
-
-                else:
-                    # G0 fixed
-                    if self._parameters['fixed_distance'] == \
-                            'distance_source_g1' or \
-                            self._parameters['fixed_distance'] == \
-                            'distance_g0_g1':
-                        # Distance from Source/G0 to G1 fixed (l)
-                        to_g1 = self._parameters[self._parameters
-                                                 ['fixed_distance']]  # [mm]
-
-                        # distance from G1 to G2 (dn)
-                        # dn = l / (n * p0^2 / (2 * lambda * l) - 1)
-                        # lambda and p2 in um, need to be in mm
-                        wavelength = self._parameters['design_wavelength'] * \
-                            1e-3  # [mm]
-                        p0 = self._parameters['pitch_g0'] * 1e-3  # [mm]
-
-                        self._parameters['distance_g1_g2'] = to_g1 / \
-                            ((self._parameters['talbot_order'] * p0**2) /
-                             (2 * wavelength * to_g1) - 1)  # [mm]
-
-                        # Check if l > dn:
-                        if self._parameters['distance_g1_g2'] >= to_g1:
-                            error_message = ("{0} too small for chosen talbot "
-                                             "order, energy and pitch of G1. "
-                                             "Must be larger than: {1} mm"
-                                             .format(self._parameters
-                                                     ['fixed_distance'],
-                                                     self._parameters
-                                                     ['distance_g1_g2']))
-                            logger.error(error_message)
-                            raise GeometryError(error_message)
-
-                        # Distance from Source/G0 to G2 fixed (s)
-                        total_length = self._parameters['distance_g1_g2'] + \
-                            to_g1  # [mm]
-
-                        # Source/G0 to G2 (s)
-                        total_length = to_g1 + \
-                            self._parameters['distance_g1_g2']
-                        if 'G0' in self._parameters['component_list']:
-                            self._parameters['distance_g0_g2'] = total_length
-                        else:
-                            self._parameters['distance_source_g2'] = \
-                                total_length
-
-                    elif self._parameters['fixed_distance'] == \
-                            'distance_source_g2' or \
-                            self._parameters['fixed_distance'] == \
-                            'distance_g0_g2':
-                        # Distance from Source/G0 to G2 fixed (s)
-                        total_length = self._parameters[self._parameters
-                                                        ['fixed_distance']]
-
-                        # distance from G1 to G2 (dn)
-                        # dn = s / (s * 2 * lambda / (n * p2^2) + 1)
-                        # lambda and p2 in um, need to be in mm
-                        wavelength = self._parameters['design_wavelength'] * \
-                            1e-3  # [mm]
-                        p0 = self._parameters['pitch_g0'] * 1e-3  # [mm]
-
-                        self._parameters['distance_g1_g2'] = total_length / \
-                            ((self._parameters['talbot_order'] * p0**2) /
-                             (2 * wavelength * total_length) + 1)  # [mm]
-
-                        # Distance from Source/G0 to G1 fixed (l)
-                        to_g1 = total_length - \
-                            self._parameters['distance_g1_g2']  # [mm]
-
-                        # Check if l > dn:
-                        if self._parameters['distance_g1_g2'] >= to_g1:
-                            error_message = ("{0} too small for chosen talbot "
-                                             "order, energy and pitch of G1. "
-                                             "Must be larger than: {1} mm"
-                                             .format(self._parameters
-                                                     ['fixed_distance'],
-                                                     self._parameters
-                                                     ['distance_g1_g2']))
-                            logger.error(error_message)
-                            raise GeometryError(error_message)
-
-                        if 'G0' in self._parameters['component_list']:
-                            self._parameters['distance_g0_g1'] = to_g1
-                        else:
-                            self._parameters['distance_source_g1'] = to_g1
-
-                    # Magnification (s/l)
-                    M = total_length / to_g1
-
-                    # Pitches [um]
-                    self._parameters['pitch_g1'] = \
-                        self._nu * self._parameters['pitch_g2'] / M
-                    if 'G0' in self._parameters['component_list']:
-                        self._parameters['pitch_g0'] = \
-                            (to_g1 / self._parameters['distance_g1_g2']) * \
-                            self._parameters['pitch_g2']
-
-                    # Duty cycles
-                    self._parameters['duty_cycle_g1'] = \
-                        self._parameters['duty_cycle_g2']
-                    if 'G0' in self._parameters['component_list']:
-                        self._parameters['duty_cycle_g0'] = \
-                            self._parameters['duty_cycle_g2']
+            if not p['dual_phase']:
+                self._calc_cone(inverse=False)
             else:
                 # Dual phase setup
 
                 # Remaining distance
-                if self._parameters['fixed_distance'] == \
-                            'distance_source_g1':
-                    self._parameters['distance_source_g2'] = \
-                        self._parameters['distance_source_g1'] + \
-                        self._parameters['distance_g1_g2']
-                elif self._parameters['fixed_distance'] == \
-                            'distance_source_g2':
-                    self._parameters['distance_source_g1'] = \
-                        self._parameters['distance_source_g2'] - \
-                        self._parameters['distance_g1_g2']
+                s_g1 = p['distance_source_g1']  # [mm]
+                g1_g2 = p['distance_g1_g2']  # [mm]
+                if p['fixed_distance'] == 'distance_source_g1':
+                    p['distance_source_g2'] = s_g1 + g1_g2
+                elif p['fixed_distance'] == 'distance_source_g2':
+                    s_g1 = p['distance_source_g2'] - g1_g2
+                    p['distance_source_g1'] = s_g1
 
                 # G2
                 # Duty cycle
-                self._parameters['duty_cycle_g2'] = \
-                    self._parameters['duty_cycle_g1']
+                self._propagate_duty_cycles('g1')
                 # Pitche [um]
-                s_g1 = self._parameters['distance_source_g1']  # [mm]
-                g1_g2 = self._parameters['distance_g1_g2']  # [mm]
-                self._parameters['pitch_g2'] = \
-                    self._parameters['pitch_g1'] * (s_g1 + g1_g2)/s_g1
+                p1 = p['pitch_g1']  # [um]
+                p['pitch_g2'] = p1 * (s_g1 + g1_g2)/s_g1
 
                 # Fringe at detector [um] # Duty cycle
-                self._parameters['duty_cycle_fringe'] = \
-                    self._parameters['duty_cycle_g1']
+                p['duty_cycle_fringe'] = p['duty_cycle_g1']
                 # Pitche [um]
-                g2_d = self._parameters['distance_g2_detector']  # [mm]
-                p1 = self._parameters['pitch_g1']  # [um]
-                self._parameters['pitch_fringe'] = \
-                    ((s_g1 + g1_g2 + g2_d)/(s_g1 + g1_g2) /
-                     (1.0/p1 - s_g1/(p1*(s_g1 + g1_g2))))
+                g2_d = p['distance_g2_detector']  # [mm]
+                # ((s+g2_d)/s) / (1/p1 - s_g1/(p1*s)), s = s_g1 + g1_g2
+                p['pitch_fringe'] = (s_g1 + g1_g2 + g2_d) * p1 / g1_g2
 
         logger.info("... done.")
 
@@ -542,73 +237,56 @@ class Geometry():
 
         """
         logger.info("Calculating symmetrical setup...")
-        if self._parameters['fixed_grating'] == 'g1':
+        p = self._parameters
+        nu = self._nu
+        has_g0 = self._has_g0
+        if p['fixed_grating'] == 'g1':
             # G1 fixed
 
             # Pitches
-            self._parameters['pitch_g2'] = \
-                2.0 * self._parameters['pitch_g1'] / self._nu
-            if 'G0' in self._parameters['component_list']:
-                self._parameters['pitch_g0'] = \
-                    self._parameters['pitch_g2']
+            pitch_g1 = p['pitch_g1']
+            p['pitch_g2'] = 2.0 * pitch_g1 / nu
+            if has_g0:
+                p['pitch_g0'] = p['pitch_g2']
 
             # Duty cycles
-            self._parameters['duty_cycle_g2'] = \
-                self._parameters['duty_cycle_g1']
-            if 'G0' in self._parameters['component_list']:
-                self._parameters['duty_cycle_g0'] = \
-                    self._parameters['duty_cycle_g1']
+            self._propagate_duty_cycles('g1')
 
-        elif self._parameters['fixed_grating'] == 'g2':
+        elif p['fixed_grating'] == 'g2':
             # G2 fixed
 
             # Pitches
-            self._parameters['pitch_g1'] = \
-                self._nu * self._parameters['pitch_g2'] / 2.0
-            if 'G0' in self._parameters['component_list']:
-                self._parameters['pitch_g0'] = \
-                    self._parameters['pitch_g2']
+            pitch_g1 = nu * p['pitch_g2'] / 2.0
+            p['pitch_g1'] = pitch_g1
+            if has_g0:
+                p['pitch_g0'] = p['pitch_g2']
 
             # Duty cycles
-            self._parameters['duty_cycle_g1'] = \
-                self._parameters['duty_cycle_g2']
-            if 'G0' in self._parameters['component_list']:
-                self._parameters['duty_cycle_g0'] = \
-                    self._parameters['duty_cycle_g2']
+            self._propagate_duty_cycles('g2')
         else:
             # G0 fixed
 
             # Pitches
-            self._parameters['pitch_g1'] = \
-                self._nu * self._parameters['pitch_g0'] / 2.0
-            self._parameters['pitch_g2'] = \
-                self._parameters['pitch_g0']
+            pitch_g1 = nu * p['pitch_g0'] / 2.0
+            p['pitch_g1'] = pitch_g1
+            p['pitch_g2'] = p['pitch_g0']
 
             # Duty cycles
-            self._parameters['duty_cycle_g1'] = \
-                self._parameters['duty_cycle_g0']
-            self._parameters['duty_cycle_g2'] = \
-                self._parameters['duty_cycle_g0']
+            self._propagate_duty_cycles('g0')
 
         # Distances (the same for all, based on p1)
         # G1 to G2
-        talbot_distance = self._parameters['talbot_order'] * \
-            (np.square(self._parameters['pitch_g1'] / self._nu) /
-             (2.0 * self._parameters['design_wavelength']))
-        self._parameters['distance_g1_g2'] = 2.0 * talbot_distance  # [um]
-        self._parameters['distance_g1_g2'] = \
-            self._parameters['distance_g1_g2'] * 1e-3  # [mm]
+        talbot_distance = _talbot_distance(pitch_g1, nu, p['talbot_order'],
+                                           p['design_wavelength'])  # [mm]
+        distance_g1_g2 = 2.0 * talbot_distance  # [mm]
+        p['distance_g1_g2'] = distance_g1_g2
         # Source/G0 to G1 and Source/G0 to G2:
-        if 'G0' in self._parameters['component_list']:
-            self._parameters['distance_g0_g1'] = \
-                self._parameters['distance_g1_g2']
-            self._parameters['distance_g0_g2'] = \
-                2 * self._parameters['distance_g1_g2']
+        if has_g0:
+            p['distance_g0_g1'] = distance_g1_g2
+            p['distance_g0_g2'] = 2 * distance_g1_g2
         else:
-            self._parameters['distance_source_g1'] = \
-                self._parameters['distance_g1_g2']
-            self._parameters['distance_source_g2'] = \
-                2 * self._parameters['distance_g1_g2']
+            p['distance_source_g1'] = distance_g1_g2
+            p['distance_source_g2'] = 2 * distance_g1_g2
 
         logger.info("... done.")
 
@@ -617,314 +295,113 @@ class Geometry():
         For cone
         """
         logger.info("Calculating inverse setup...")
-        # G1 fixed
-        if self._parameters['fixed_grating'] == 'g1':
-            # Talbot distance (Dn)
-            talbot_distance = self._parameters['talbot_order'] * \
-                (np.square(self._parameters['pitch_g1'] / self._nu) /
-                 (2 * self._parameters['design_wavelength']))  # [um]
-            talbot_distance = talbot_distance * 1e-3  # [mm]
-
-            # Other distances
-            if self._parameters['fixed_distance'] == \
-                    'distance_source_g1' or \
-                    self._parameters['fixed_distance'] == \
-                    'distance_g0_g1':
-                # Distance from Source/G0 to G1 fixed (l)
-                to_g1 = self._parameters[self._parameters
-                                         ['fixed_distance']]  # [mm]
-                # G1 to G2 (dn)
-                self._parameters['distance_g1_g2'] = \
-                    to_g1 * talbot_distance / \
-                    (to_g1 - talbot_distance)
-
-                # Check if valid distance input
-                if self._parameters['distance_g1_g2'] <= 0:
-                    error_message = ("{0} too small for chosen talbot "
-                                     "order, energy and pitch of G1. "
-                                     "Must be larger than: {1} mm"
-                                     .format(self._parameters
-                                             ['fixed_distance'],
-                                             talbot_distance))
-                    logger.error(error_message)
-                    raise GeometryError(error_message)
-                elif self._parameters['distance_g1_g2'] < to_g1:
-                    error_message = ("{0} too large for chosen talbot "
-                                     "order, energy and pitch of G1."
-                                     .format(self._parameters
-                                             ['fixed_distance']))
-                    logger.error(error_message)
-                    raise GeometryError(error_message)
-
-                # Source/G0 to G2 (s)
-                total_length = to_g1 + \
-                    self._parameters['distance_g1_g2']
-                if 'G0' in self._parameters['component_list']:
-                    self._parameters['distance_g0_g2'] = total_length
-                else:
-                    self._parameters['distance_source_g2'] = \
-                        total_length
-
-            elif self._parameters['fixed_distance'] == \
-                    'distance_source_g2' or \
-                    self._parameters['fixed_distance'] == \
-                    'distance_g0_g2':
-                # Distance from Source/G0 to G2 fixed (s)
-                total_length = self._parameters[self._parameters
-                                                ['fixed_distance']]
-
-                # Source/G0 to G1 (l)
-                # Checks ultimately if s> 2*dn:
-                if total_length <= 4.0 * talbot_distance:
-                    error_message = ("{0} too small for chosen talbot "
-                                     "order, energy and pitch of G1. "
-                                     "Must be larger than: {1} mm"
-                                     .format(self._parameters
-                                             ['fixed_distance'],
-                                             4.0 * talbot_distance))
-                    logger.error(error_message)
-                    raise GeometryError(error_message)
-
-                to_g1 = total_length/2.0 - np.sqrt(total_length**2.0 /
-                                                   4.0 - total_length *
-                                                   talbot_distance)
-
-                if 'G0' in self._parameters['component_list']:
-                    self._parameters['distance_g0_g1'] = to_g1
-                else:
-                    self._parameters['distance_source_g1'] = to_g1
+        self._calc_cone(inverse=True)
+        logger.info("... done.")
 
-                # G1 to G2 (dn)
-                self._parameters['distance_g1_g2'] = \
-                    to_g1 * talbot_distance / \
-                    (to_g1 - talbot_distance)
+    def _calc_cone(self, inverse):
+        """
+        Cone beam distances, pitches and duty cycles for a conventional or
+        inverse setup, based on the fixed grating and the fixed distance
+        (see _solve_cone).
 
-            # Magnification (s/l)
-            M = total_length / to_g1
+        Parameters
+        ==========
 
-            # Pitches
-            self._parameters['pitch_g2'] = \
-                M * self._parameters['pitch_g1'] / self._nu
-            if 'G0' in self._parameters['component_list']:
-                self._parameters['pitch_g0'] = \
-                    (to_g1 / self._parameters['distance_g1_g2']) * \
-                    self._parameters['pitch_g2']
+        inverse [boolean]:      inverse (True) or conventional (False) setup
 
-            # Duty cycles
-            self._parameters['duty_cycle_g2'] = \
-                self._parameters['duty_cycle_g1']
-            if 'G0' in self._parameters['component_list']:
-                self._parameters['duty_cycle_g0'] = \
-                    self._parameters['duty_cycle_g1']
+        Notes
+        =====
 
-        elif self._parameters['fixed_grating'] == 'g2':
-            # G2 fixed
-            if self._parameters['fixed_distance'] == \
-                    'distance_source_g1' or \
-                    self._parameters['fixed_distance'] == \
-                    'distance_g0_g1':
-                # Distance from Source/G0 to G1 fixed (l)
-                to_g1 = self._parameters[self._parameters
-                                         ['fixed_distance']]  # [mm]
-
-                # distance from G1 to G2 (dn)
-                # dn = -05*l + sqrt(0.25*l^2 + n/(2*lambda)*p2^2*l)
-                # lambda and p2 in um, need to be in mm
-                wavelength = self._parameters['design_wavelength'] * \
-                    1e-3  # [mm]
-                p2 = self._parameters['pitch_g2'] * 1e-3  # [mm]
-
-                self._parameters['distance_g1_g2'] = -0.5 * to_g1 + \
-                    np.sqrt(0.25 * to_g1**2 +
-                            self._parameters['talbot_order'] *
-                            p2**2 * to_g1 / (2 * wavelength))  # [mm]
-
-                # Check if l < dn:
-                if self._parameters['distance_g1_g2'] <= to_g1:
-                    error_message = ("{0} too large for chosen talbot "
-                                     "order, energy and pitch of G1. "
-                                     "Must be smaller than: {1} mm"
-                                     .format(self._parameters
-                                             ['fixed_distance'],
-                                             self._parameters
-                                             ['distance_g1_g2']))
-
-                # Distance from Source/G0 to G2 fixed (s)
-                total_length = self._parameters['distance_g1_g2'] + \
-                    to_g1  # [mm]
-
-                # Source/G0 to G2 (s)
-                total_length = to_g1 + \
-                    self._parameters['distance_g1_g2']
-                if 'G0' in self._parameters['component_list']:
-                    self._parameters['distance_g0_g2'] = total_length
-                else:
-                    self._parameters['distance_source_g2'] = \
-                        total_length
-
-            elif self._parameters['fixed_distance'] == \
-                    'distance_source_g2' or \
-                    self._parameters['fixed_distance'] == \
-                    'distance_g0_g2':
-                # Distance from Source/G0 to G2 fixed (s)
-                total_length = self._parameters[self._parameters
-                                                ['fixed_distance']]
-
-                # distance from G1 to G2 (dn)
-                # dn = s / (s * 2 * lambda / (n * p2^2) + 1)
-                # lambda and p2 in um, need to be in mm
-                wavelength = self._parameters['design_wavelength'] * \
-                    1e-3  # [mm]
-                p2 = self._parameters['pitch_g2'] * 1e-3  # [mm]
-
-                self._parameters['distance_g1_g2'] = total_length / \
-                    (total_length * 2 * wavelength /
-                     (self._parameters['talbot_order'] * p2**2) + 1)  # [mm]
-
-                # Distance from Source/G0 to G1 fixed (l)
-                to_g1 = total_length - \
-                    self._parameters['distance_g1_g2']  # [mm]
-
-                # Check if l < dn:
-                if self._parameters['distance_g1_g2'] <= to_g1:
-                    error_message = ("{0} too large for chosen talbot "
-                                     "order, energy and pitch of G1. "
-                                     "Must be smaller than: {1} mm"
-                                     .format(self._parameters
-                                             ['fixed_distance'],
-                                             self._parameters
-                                             ['distance_g1_g2']))
-                    logger.error(error_message)
-                    raise GeometryError(error_message)
-
-                if 'G0' in self._parameters['component_list']:
-                    self._parameters['distance_g0_g1'] = to_g1
-                else:
-                    self._parameters['distance_source_g1'] = to_g1
+        Magnification M:
+            M = s / l
 
-            # Magnification (s/l)
-            M = total_length / to_g1
+        Pitches:
+            p1 = nu * p2 / M
+            p2 = M * p1 / nu
+            p0 = p2 * l / dn
+            p2 = p0 * dn / l    (G0 fixed)
 
-            # Pitches [um]
-            self._parameters['pitch_g1'] = \
-                self._nu * self._parameters['pitch_g2'] / M
-            if 'G0' in self._parameters['component_list']:
-                self._parameters['pitch_g0'] = \
-                    (to_g1 / self._parameters['distance_g1_g2']) * \
-                    self._parameters['pitch_g2']
+        Conditions (l == dn is invalid for all fixed gratings):
+            conventional: l > dn
+            inverse: l < dn
 
-            # Duty cycles
-            self._parameters['duty_cycle_g1'] = \
-                self._parameters['duty_cycle_g2']
-            if 'G0' in self._parameters['component_list']:
-                self._parameters['duty_cycle_g0'] = \
-                    self._parameters['duty_cycle_g2']
+        """
+        p = self._parameters
+        nu = self._nu
+        has_g0 = self._has_g0
+        fixed_grating = p['fixed_grating']
+        # Fixed distance from Source/G0 to G1 (l) or to G2 (s)
+        fixed_distance = p['fixed_distance']
+        fixed_to_g1 = fixed_distance.endswith('_g1')
+        fixed_value = p[fixed_distance]  # [mm]
+
+        # Talbot distance (Dn) based on fixed pitch (p1/nu, p2 or p0)
+        if fixed_grating == 'g1':
+            talbot_distance = _talbot_distance(p['pitch_g1'], nu,
+                                               p['talbot_order'],
+                                               p['design_wavelength'])
+        else:
+            talbot_distance = _talbot_distance(p['pitch_'+fixed_grating], 1,
+                                               p['talbot_order'],
+                                               p['design_wavelength'])
+
+        # Checks ultimately if s > 2*dn:
+        if fixed_grating == 'g1' and not fixed_to_g1 and \
+                fixed_value <= 4.0 * talbot_distance:
+            _fail(_DISTANCE_TOO_SMALL, fixed_distance, 4.0 * talbot_distance)
+
+        [to_g1, distance_g1_g2, total_length] = \
+            _solve_cone(fixed_grating, fixed_to_g1, fixed_value,
+                        talbot_distance, inverse)
 
+        # Check if valid distance input
+        error = _check_cone(fixed_grating, fixed_to_g1, to_g1, distance_g1_g2,
+                            talbot_distance, inverse)
+        if error is not None:
+            _fail(error[0], fixed_distance, error[1])
+
+        # Distances
+        p['distance_g1_g2'] = distance_g1_g2
+        if has_g0:
+            p['distance_g0_g1'] = to_g1
+            p['distance_g0_g2'] = total_length
         else:
-            # G0 fixed
-            if self._parameters['fixed_distance'] == \
-                    'distance_source_g1' or \
-                    self._parameters['fixed_distance'] == \
-                    'distance_g0_g1':
-                # Distance from Source/G0 to G1 fixed (l)
-                to_g1 = self._parameters[self._parameters
-                                         ['fixed_distance']]  # [mm]
-
-                # distance from G1 to G2 (dn)
-                # dn = l / (n * p0^2 / (2 * lambda * l) - 1)
-                # lambda and p2 in um, need to be in mm
-                wavelength = self._parameters['design_wavelength'] * \
-                    1e-3  # [mm]
-                p0 = self._parameters['pitch_g0'] * 1e-3  # [mm]
-
-                self._parameters['distance_g1_g2'] = to_g1 / \
-                    ((self._parameters['talbot_order'] * p0**2) /
-                     (2 * wavelength * to_g1) - 1)  # [mm]
-
-                # Check if l < dn:
-                if self._parameters['distance_g1_g2'] <= to_g1:
-                    error_message = ("{0} too large for chosen talbot "
-                                     "order, energy and pitch of G1. "
-                                     "Must be smaller than: {1} mm"
-                                     .format(self._parameters
-                                             ['fixed_distance'],
-                                             self._parameters
-                                             ['distance_g1_g2']))
-                    logger.error(error_message)
-                    raise GeometryError(error_message)
-
-                # Distance from Source/G0 to G2 fixed (s)
-                total_length = self._parameters['distance_g1_g2'] + \
-                    to_g1  # [mm]
-
-                # Source/G0 to G2 (s)
-                total_length = to_g1 + \
-                    self._parameters['distance_g1_g2']
-                if 'G0' in self._parameters['component_list']:
-                    self._parameters['distance_g0_g2'] = total_length
-                else:
-                    self._parameters['distance_source_g2'] = \
-                        total_length
-
-            elif self._parameters['fixed_distance'] == \
-                    'distance_source_g2' or \
-                    self._parameters['fixed_distance'] == \
-                    'distance_g0_g2':
-                # Distance from Source/G0 to G2 fixed (s)
-                total_length = self._parameters[self._parameters
-                                                ['fixed_distance']]
-
-                # distance from G1 to G2 (dn)
-                # dn = s / (s * 2 * lambda / (n * p2^2) + 1)
-                # lambda and p2 in um, need to be in mm
-                wavelength = self._parameters['design_wavelength'] * \
-                    1e-3  # [mm]
-                p0 = self._parameters['pitch_g0'] * 1e-3  # [mm]
-
-                self._parameters['distance_g1_g2'] = total_length / \
-                    ((self._parameters['talbot_order'] * p0**2) /
-                     (2 * wavelength * total_length) + 1)  # [mm]
-
-                # Distance from Source/G0 to G1 fixed (l)
-                to_g1 = total_length - \
-                    self._parameters['distance_g1_g2']  # [mm]
-
-                # Check if l < dn:
-                if self._parameters['distance_g1_g2'] <= to_g1:
-                    error_message = ("{0} too large for chosen talbot "
-                                     "order, energy and pitch of G1. "
-                                     "Must be smaller than: {1} mm"
-                                     .format(self._parameters
-                                             ['fixed_distance'],
-                                             self._parameters
-                                             ['distance_g1_g2']))
-                    logger.error(error_message)
-                    raise GeometryError(error_message)
-
-                if 'G0' in self._parameters['component_list']:
-                    self._parameters['distance_g0_g1'] = to_g1
-                else:
-                    self._parameters['distance_source_g1'] = to_g1
+            p['distance_source_g1'] = to_g1
+            p['distance_source_g2'] = total_length
 
-            # Magnification (s/l)
-            M = total_length / to_g1
+        # Magnification (s/l)
+        M = total_length / to_g1
 
-            # Pitches [um]
-            self._parameters['pitch_g1'] = \
-                self._nu * self._parameters['pitch_g2'] / M
-            if 'G0' in self._parameters['component_list']:
-                self._parameters['pitch_g0'] = \
-                    (to_g1 / self._parameters['distance_g1_g2']) * \
-                    self._parameters['pitch_g2']
+        # Pitches [um]
+        if fixed_grating == 'g1':
+            p['pitch_g2'] = M * p['pitch_g1'] / nu
+        else:
+            if fixed_grating == 'g0':
+                p['pitch_g2'] = p['pitch_g0'] * distance_g1_g2 / to_g1
+            p['pitch_g1'] = nu * p['pitch_g2'] / M
+        if has_g0 and fixed_grating != 'g0':
+            p['pitch_g0'] = (to_g1 / distance_g1_g2) * p['pitch_g2']
 
-            # Duty cycles
-            self._parameters['duty_cycle_g1'] = \
-                self._parameters['duty_cycle_g2']
-            if 'G0' in self._parameters['component_list']:
-                self._parameters['duty_cycle_g0'] = \
-                    self._parameters['duty_cycle_g2']
+        # Duty cycles
+        self._propagate_duty_cycles(fixed_grating)
 
-        logger.info("... done.")
+    def _propagate_duty_cycles(self, grating):
+        """
+        Set the duty cycles of all other gratings (G0 only if in setup) to
+        the one of the given grating.
+
+        Parameters
+        ==========
+
+        grating [str]:          'g0', 'g1' or 'g2'
+
+        """
+        p = self._parameters
+        duty_cycle = p['duty_cycle_'+grating]
+        p['duty_cycle_g1'] = duty_cycle
+        p['duty_cycle_g2'] = duty_cycle
+        if self._has_g0:
+            p['duty_cycle_g0'] = duty_cycle
 
     def _update_distances(self):
         """
@@ -939,56 +416,39 @@ class Geometry():
         set.
 
         """
-        gratings = [grating for grating in self._parameters['component_list']
+        p = self._parameters
+        # Lower case grating names (as in parameter keys)
+        gratings = [grating.lower() for grating in p['component_list']
                     if "G" in grating]
+        # Source to grating distance keys
+        to_source = ['distance_source_'+grating for grating in gratings]
 
         # If radius of first grating is set manually, update
         # source to first grating distance
-        if self._parameters[gratings[0].lower()+'_bent'] and \
-                not self._parameters[gratings[0].lower()+'_matching']:
-            self._parameters['distance_source_'+gratings[0].lower()] = \
-                self._parameters['radius_'+gratings[0].lower()]
-
-        # Set distance from source to grating
-        if len(gratings) == 2:
-            self._parameters['distance_source_'+gratings[1].lower()] = \
-                self._parameters['distance_source_'+gratings[0].lower()] + \
-                self._parameters['distance_'+gratings[0].lower() +
-                                 '_'+gratings[1].lower()]
-        elif len(gratings) == 3:
-            self._parameters['distance_source_'+gratings[1].lower()] = \
-                self._parameters['distance_source_'+gratings[0].lower()] + \
-                self._parameters['distance_'+gratings[0].lower() +
-                                 '_'+gratings[1].lower()]
-            self._parameters['distance_source_'+gratings[2].lower()] = \
-                self._parameters['distance_source_'+gratings[0].lower()] + \
-                self._parameters['distance_'+gratings[0].lower() +
-                                 '_'+gratings[1].lower()] + \
-                self._parameters['distance_'+gratings[1].lower() +
-                                 '_'+gratings[2].lower()]
+        if p[gratings[0]+'_bent'] and not p[gratings[0]+'_matching']:
+            p[to_source[0]] = p['radius_'+gratings[0]]
+
+        # Set distance from source to grating (via previous grating)
+        for index in range(1, len(gratings)):
+            p[to_source[index]] = p[to_source[index-1]] + \
+                p['distance_'+gratings[index-1]+'_'+gratings[index]]
 
         # Calc source to detector distance if gratings are in system
         if gratings:
-            self._parameters['distance_source_detector'] = \
-                self._parameters['distance_source_'+gratings[-1].lower()] + \
-                self._parameters['distance_'+gratings[-1].lower()+'_detector']
+            p['distance_source_detector'] = p[to_source[-1]] + \
+                p['distance_'+gratings[-1]+'_detector']
 
         # Set grating radius
-        for grating in gratings:
-            grating = grating.lower()
-
-            if self._parameters[grating+'_bent']:
+        for grating, key in zip(gratings, to_source):
+            if p[grating+'_bent']:
                 # Check if radius/distance from source is larger 0
-                distance_to_source = \
-                    self._parameters['distance_source_'+grating]
+                distance_to_source = p[key]
                 if distance_to_source == 0.0:
-                    error_message = ("Radius of {0} is 0. Either set radius "
-                                     "manually or choose larger distance from "
-                                     "source.".format(grating.upper()))
-                    logger.error(error_message)
-                    raise GeometryError(error_message)
-                if self._parameters[grating+'_matching']:
-                    self._parameters['radius_'+grating] = distance_to_source
+                    _fail("Radius of {0} is 0. Either set radius manually or "
+                          "choose larger distance from source.",
+                          grating.upper())
+                if p[grating+'_matching']:
+                    p['radius_'+grating] = distance_to_source
 
     def _check_sample_position(self):
         """
@@ -996,44 +456,32 @@ class Geometry():
         calculates sample distance from source.
 
         """
-        sample_index = self._parameters['component_list'].index('Sample')
-        previous_component = \
-            self._parameters['component_list'][sample_index-1].lower()
-        next_component = \
-            self._parameters['component_list'][sample_index+1].lower()
-
-        if 'a' in self._parameters['sample_position']:
-            # Sample relative to previous component ('after')
-
-            # Calc source to sample center distance
-            self._parameters['distance_source_sample'] = \
-                self._parameters['distance_source_'+previous_component] + \
-                self._parameters['sample_distance'] + \
-                self._parameters['sample_diameter']/2.0
-            # Check distance of sample to next component
-            if self._parameters['sample_diameter'] > \
-                    (self._parameters['distance_source_'+next_component] -
-                     self._parameters['distance_source_sample']):
-                error_message = ("Sample diameter larger than distance from "
-                                 "sample to next component.")
-                logger.error(error_message)
-                raise GeometryError(error_message)
+        p = self._parameters
+        component_list = p['component_list']
+        sample_index = component_list.index('Sample')
+        previous_component = component_list[sample_index-1].lower()
+        next_component = component_list[sample_index+1].lower()
+        sample_diameter = p['sample_diameter']
+
+        # Sample relative to previous ('after') or next ('before') component
+        if 'a' in p['sample_position']:
+            sign = 1.0
+            anchor, other, other_name = \
+                previous_component, next_component, 'next'
         else:
-            # Sample relative to next component ('before')
-
-            # Calc source to sample center distance
-            self._parameters['distance_source_sample'] = \
-                self._parameters['distance_source_'+next_component] - \
-                self._parameters['sample_distance'] - \
-                self._parameters['sample_diameter']/2.0
-            # Check distance of sample to previous component
-            if self._parameters['sample_diameter'] > \
-                    (self._parameters['distance_source_sample'] -
-                     self._parameters['distance_source_'+previous_component]):
-                error_message = ("Sample diameter larger than distance from "
-                                 "sample to previous component.")
-                logger.error(error_message)
-                raise GeometryError(error_message)
+            sign = -1.0
+            anchor, other, other_name = \
+                next_component, previous_component, 'previous'
+
+        # Calc source to sample center distance
+        distance_source_sample = p['distance_source_'+anchor] + \
+            sign * p['sample_distance'] + sign * sample_diameter/2.0
+        p['distance_source_sample'] = distance_source_sample
+        # Check distance of sample to other component
+        if sample_diameter > sign * (p['distance_source_'+other] -
+                                     distance_source_sample):
+            _fail("Sample diameter larger than distance from sample to {0} "
+                  "component.", other_name)
 
     # Set geometry results
     def _get_geometry_results(self):
@@ -1061,77 +509,202 @@ class Geometry():
 
         """
         self.results = dict()
+        p = self._parameters
 
         # Setup
         # Add component list
-        self.results['component_list'] = self._parameters['component_list']
+        self.results['component_list'] = p['component_list']
         # Add geometries
-        self.results['gi_geometry'] = self._parameters['gi_geometry']
-        self.results['beam_geometry'] = self._parameters['beam_geometry']
-        self.results['dual_phase'] = self._parameters['dual_phase']
-
-        # Distances
-        # distances =  [('distance_b', 10), ('distance_a', 10)]
-        distances = [(distance_name, distance_value)
-                     for distance_name, distance_value
-                     in self._parameters.iteritems()
-                     if ('distance_' in distance_name and
-                         distance_value is not None)]
-        for distance in distances:
-            self.results[distance[0]] = distance[1]
-
-        # Gratings
-        # Add pitches
-        pitches = [(pitch_name, pitch_value) for pitch_name, pitch_value
-                   in self._parameters.iteritems()
-                   if ('pitch_' in pitch_name and pitch_value is not None)]
-        for pitch in pitches:
-            self.results[pitch[0]] = pitch[1]
-        # Add duty cycles
-        duty_cycles = [(duty_cycle_name, duty_cycle_value)
-                       for duty_cycle_name, duty_cycle_value
-                       in self._parameters.iteritems()
-                       if ('duty_cycle_' in duty_cycle_name and
-                           duty_cycle_value is not None)]
-        for duty_cycle in duty_cycles:
-            self.results[duty_cycle[0]] = duty_cycle[1]
+        self.results['gi_geometry'] = p['gi_geometry']
+        self.results['beam_geometry'] = p['beam_geometry']
+        self.results['dual_phase'] = p['dual_phase']
+
+        # Distances, pitches [um] and duty cycles (if not None)
+        for keys in (self._DISTANCE_KEYS, self._PITCH_KEYS,
+                     self._DUTY_CYCLE_KEYS):
+            for key in keys:
+                value = p.get(key)
+                if value is not None:
+                    self.results[key] = value
         # Add grating radii
         # if bent: radius not None <=> if straight: radius None
-        radii = [(radius_name, radius_value) for radius_name, radius_value
-                 in self._parameters.iteritems()
-                 if 'radius_' in radius_name]
-
-        for radius in radii:
-            self.results[radius[0]] = radius[1]
+        for key in self._RADIUS_KEYS:
+            if key in p:
+                self.results[key] = p[key]
 
         # Add sample info
-        if 'Sample' in self._parameters['component_list']:
+        if self._has_sample:
             # If sample defined
-            self.results['sample_position'] = \
-                self._parameters['sample_position']
-            self.results['sample_distance'] = \
-                self._parameters['sample_distance']
-            self.results['sample_shape'] = self._parameters['sample_shape']
-            self.results['sample_diameter'] = \
-                self._parameters['sample_diameter']
+            self.results['sample_position'] = p['sample_position']
+            self.results['sample_distance'] = p['sample_distance']
+            self.results['sample_shape'] = p['sample_shape']
+            self.results['sample_diameter'] = p['sample_diameter']
 
         # Detector
-        self.results['curved_detector'] = self._parameters['curved_detector']
+        self.results['curved_detector'] = p['curved_detector']
         if self.results['curved_detector']:
             self.results['radius_detector'] = \
-                self._parameters['distance_source_detector']  # [mm]
+                p['distance_source_detector']  # [mm]
         else:
             self.results['radius_detector'] =  None
 
-        if self._parameters['field_of_view'] is not None and \
-                self._parameters['pixel_size'] is not None:
-            self.results['width'] = self._parameters['field_of_view'][0] * \
-                self._parameters['pixel_size'] * 1e-3  # [mm]
-            self.results['height'] = self._parameters['field_of_view'][1] * \
-                self._parameters['pixel_size'] * 1e-3  # [mm]
+        if p['field_of_view'] is not None and p['pixel_size'] is not None:
+            self.results['width'] = p['field_of_view'][0] * \
+                p['pixel_size'] * 1e-3  # [mm]
+            self.results['height'] = p['field_of_view'][1] * \
+                p['pixel_size'] * 1e-3  # [mm]
             self.results['fan_angle'] = 2.0 * \
-                np.arctan(self.results['width'] / (2.0 *
+                math.atan(self.results['width'] / (2.0 *
                           self.results['distance_source_detector']))
             self.results['cone_angle'] = 2.0 * \
-                np.arctan(self.results['height'] / (2.0 *
+                math.atan(self.results['height'] / (2.0 *
                           self.results['distance_source_detector']))
+
+
+def _talbot_distance(pitch, nu, talbot_order, design_wavelength):
+    """
+    Fractional Talbot distance Dn.
+
+    Parameters
+    ==========
+
+    pitch [um]:                 pitch of G1 (or of G0/G2, with nu=1)
+    nu:                         2 if pi shift, 1 if pi-half shift
+    talbot_order
+    design_wavelength [um]
+
+    Returns
+    =======
+
+    talbot_distance [mm]
+
+    Notes
+    =====
+
+    Dn = n * p1^2/(nu^2 * 2 * lambda), n: talbot_order
+
+    """
+    return talbot_order * (pitch / nu)**2 / \
+        (2.0 * design_wavelength) * 1e-3
+
+
+def _solve_cone(fixed_grating, fixed_to_g1, fixed_value, talbot_distance,
+                inverse):
+    """
+    Closed form cone beam distances, based on the fixed grating and the
+    fixed distance.
+
+    Parameters
+    ==========
+
+    fixed_grating [str]:        'g0', 'g1' or 'g2'
+    fixed_to_g1 [boolean]:      fixed distance is Source/G0 to G1 (l, True)
+                                or to G2 (s, False)
+    fixed_value [mm]:           value of fixed distance
+    talbot_distance [mm]:       Dn of fixed pitch (see _talbot_distance),
+                                with nu=1 for G0 and G2
+    inverse [boolean]:          inverse (True) or conventional (False) setup
+
+    Returns
+    =======
+
+    [to_g1, distance_g1_g2, total_length] [mm]:     [l, dn, s]
+
+    Notes
+    =====
+
+    G1 fixed:
+        dn = l * Dn / (l - Dn)
+        l = s/2 + sqrt((s^2)/4 - s * Dn)    (conventional, - for inverse)
+    G2 fixed:
+        dn = -l/2 + sqrt((l^2)/4 + l * Dn)
+        dn = s / (s / Dn + 1)
+    G0 fixed:
+        dn = l / (Dn / l - 1)
+        dn = s / (Dn / s + 1)
+
+    s = l + dn
+
+    """
+    if fixed_to_g1:
+        to_g1 = fixed_value
+        if fixed_grating == 'g1':
+            distance_g1_g2 = to_g1 * talbot_distance / \
+                (to_g1 - talbot_distance)
+        elif fixed_grating == 'g2':
+            distance_g1_g2 = -0.5 * to_g1 + \
+                math.sqrt(0.25 * to_g1**2 + to_g1 * talbot_distance)
+        else:
+            distance_g1_g2 = to_g1 / (talbot_distance / to_g1 - 1)
+        total_length = to_g1 + distance_g1_g2
+    else:
+        total_length = fixed_value
+        if fixed_grating == 'g1':
+            # sqrt((s^2)/4 - s * Dn) = s/2 * sqrt(1 - 4 * Dn / s)
+            half_length = 0.5 * total_length
+            root = half_length * \
+                math.sqrt(1.0 - 4.0 * talbot_distance / total_length)
+            if inverse:
+                to_g1 = half_length - root
+            else:
+                to_g1 = half_length + root
+            distance_g1_g2 = to_g1 * talbot_distance / \
+                (to_g1 - talbot_distance)
+        else:
+            if fixed_grating == 'g2':
+                distance_g1_g2 = total_length / \
+                    (total_length / talbot_distance + 1)
+            else:
+                distance_g1_g2 = total_length / \
+                    (talbot_distance / total_length + 1)
+            to_g1 = total_length - distance_g1_g2
+    return to_g1, distance_g1_g2, total_length
+
+
+def _check_cone(fixed_grating, fixed_to_g1, to_g1, distance_g1_g2,
+                talbot_distance, inverse):
+    """
+    Check cone beam distances (see _solve_cone).
+
+    Parameters
+    ==========
+
+    fixed_grating [str]:        'g0', 'g1' or 'g2'
+    fixed_to_g1 [boolean]:      fixed distance is Source/G0 to G1 (l)
+    to_g1 [mm]:                 l
+    distance_g1_g2 [mm]:        dn
+    talbot_distance [mm]:       Dn of fixed pitch
+    inverse [boolean]:          inverse (True) or conventional (False) setup
+
+    Returns
+    =======
+
+    None if valid, else [error message, limit [mm]]
+
+    """
+    if fixed_grating == 'g1' and fixed_to_g1 and distance_g1_g2 <= 0:
+        return [_DISTANCE_TOO_SMALL, talbot_distance]
+    if inverse and distance_g1_g2 <= to_g1:
+        # l < dn
+        return [_DISTANCE_TOO_LARGE, distance_g1_g2]
+    if not inverse and distance_g1_g2 >= to_g1:
+        # l > dn
+        return [_DISTANCE_TOO_SMALL, distance_g1_g2]
+    return None
+
+
+def _fail(error_message, *args):
+    """
+    Log error message and raise GeometryError.
+
+    Parameters
+    ==========
+
+    error_message [str]:    formatted with args (str.format), if given
+    args:                   format arguments
+
+    """
+    if args:
+        error_message = error_message.format(*args)
+    logger.error(error_message)
+    raise GeometryError(error_message)
@@ -0,0 +1,148 @@
+"""
+Tests for simulation.check_input.
+
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import simulation.check_input as check_input  # noqa: E402
+
+
+def _write(path, text):
+    with open(path, 'w') as text_file:
+        text_file.write(text)
+
+
+class TestLastChecked(unittest.TestCase):
+    """
+    Memo of the last successfully checked input in _test_check_parser.
+
+    The geometry and general checks are replaced by a counting check, which
+    marks the parameters as checked. The parser infos are not needed.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.spectrum_file = os.path.join(self.directory, 'spectrum.csv')
+        _write(self.spectrum_file, "energy, photons\n10, 1\n20, 2\n")
+        self.parameters = dict(spectrum_file=self.spectrum_file,
+                               range_=np.array([10.0, 20.0]),
+                               component_list=[])
+        self.number_checks = 0
+        self.checks = (check_input.geometry_input, check_input.all_input)
+        check_input.geometry_input = self._check
+        check_input.all_input = lambda parameters, parser_info: None
+        self.parser_info = check_input._parser_info
+        check_input._parser_info = dict()
+        check_input._last_checked = None
+
+    def tearDown(self):
+        check_input.geometry_input, check_input.all_input = self.checks
+        check_input._parser_info = self.parser_info
+        check_input._last_checked = None
+        shutil.rmtree(self.directory)
+
+    def _check(self, parameters, parser_info):
+        self.number_checks += 1
+        parameters['checked'] = self.number_checks
+
+    def test_unchanged_input(self):
+        check_input._test_check_parser(dict(self.parameters))
+        parameters = dict(self.parameters)
+        check_input._test_check_parser(parameters)
+        self.assertEqual(self.number_checks, 1)
+        self.assertEqual(parameters['checked'], 1)
+
+    def test_changed_input(self):
+        check_input._test_check_parser(dict(self.parameters))
+        parameters = dict(self.parameters, range_=np.array([10.0, 15.0]))
+        check_input._test_check_parser(parameters)
+        self.assertEqual(self.number_checks, 2)
+
+    def test_changed_spectrum_file(self):
+        check_input._test_check_parser(dict(self.parameters))
+        _write(self.spectrum_file, "energy, photons\n10, 1\n20, 2\n30, 3\n")
+        parameters = dict(self.parameters)
+        check_input._test_check_parser(parameters)
+        self.assertEqual(self.number_checks, 2)
+        self.assertEqual(parameters['checked'], 2)
+
+    def test_failed_check(self):
+        def fail(parameters, parser_info):
+            self.number_checks += 1
+            raise check_input.InputError("Invalid input.")
+        check_input.geometry_input = fail
+        for _ in range(2):
+            self.assertRaises(check_input.InputError,
+                              check_input._test_check_parser,
+                              dict(self.parameters))
+        self.assertEqual(self.number_checks, 2)
+
+
+class TestSpectrumCache(unittest.TestCase):
+    """
+    Loaded spectra in _get_spectrum, oldest entry dropped when full.
+    """
+    def setUp(self):
+        check_input._spectrum_cache.clear()
+
+    def tearDown(self):
+        check_input._spectrum_cache.clear()
+
+    def test_oldest_dropped(self):
+        ranges = [(10.0, 20.0 + index)
+                  for index in range(check_input._SPECTRUM_CACHE_SIZE + 1)]
+        for range_ in ranges:
+            check_input._get_spectrum(None, range_, 1.0, 15.0)
+        keys = [(None, range_, 1.0, 15.0) for range_ in ranges]
+        self.assertEqual(list(check_input._spectrum_cache), keys[1:])
+
+
+class TestReadSpectrum(unittest.TestCase):
+    """
+    Validation of spectrum files in _read_spectrum.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.spectrum_file = os.path.join(self.directory, 'spectrum.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _read(self, rows):
+        _write(self.spectrum_file, "energy, photons\n" + rows)
+        return check_input._read_spectrum(self.spectrum_file)
+
+    def test_sorted(self):
+        spectrum = self._read("10, 1\n20, 2\n30, 3\n")
+        np.testing.assert_array_equal(spectrum['energies'], [10, 20, 30])
+        np.testing.assert_array_equal(spectrum['photons'], [1, 2, 3])
+
+    def test_unsorted(self):
+        spectrum = self._read("30, 3\n10, 1\n20, 2\n")
+        np.testing.assert_array_equal(spectrum['energies'], [10, 20, 30])
+        np.testing.assert_array_equal(spectrum['photons'], [1, 2, 3])
+
+    def test_nan(self):
+        self.assertRaises(check_input.InputError, self._read,
+                          "10, 1\n20, nan\n")
+        self.assertRaises(check_input.InputError, self._read,
+                          "10, 1\ninf, 2\n")
+
+    def test_negative_photons(self):
+        self.assertRaises(check_input.InputError, self._read,
+                          "10, 1\n20, -2\n")
+
+    def test_duplicate_energies(self):
+        self.assertRaises(check_input.InputError, self._read,
+                          "20, 1\n10, 2\n20, 3\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
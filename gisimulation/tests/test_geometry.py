@@ -0,0 +1,308 @@
+"""
+Regression tests for simulation.geometry.Geometry.
+
+Pins the results of parallel, conventional, symmetrical and inverse setups
+for each fixed grating and fixed distance, and of a sample placed before
+or after a component.
+
+Design values used throughout (pi shift, i.e. nu = 2, talbot order 1):
+
+    design_wavelength = 5e-5 um
+    fixed pitch = 4 um  =>  Dn = 40 mm (G1: 4/nu, G0/G2: 2 um with nu = 1)
+
+"""
+import math
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from simulation.geometry import Geometry, GeometryError  # noqa: E402
+
+
+def _parameters(components, **kwargs):
+    """
+    Minimal parameter dict for Geometry, all unset values None.
+
+    Parameters
+    ==========
+
+    components [list]:          component_list without Source and Detector
+    kwargs:                     parameters to set
+
+    Returns
+    =======
+
+    parameters [dict]
+
+    """
+    parameters = dict(
+        component_list=['Source'] + components + ['Detector'],
+        gi_geometry='conv', beam_geometry='cone', dual_phase=False,
+        phase_shift_g1=math.pi, talbot_order=1, design_wavelength=5e-5,
+        fixed_grating=None, fixed_distance=None,
+        distance_source_g0=None, distance_source_g1=None,
+        distance_source_g2=None, distance_source_detector=None,
+        distance_source_sample=None, distance_g0_g1=None,
+        distance_g0_g2=None, distance_g0_detector=None, distance_g1_g2=None,
+        distance_g1_detector=None, distance_g2_detector=100.0,
+        sample_position=None, sample_distance=None, sample_shape=None,
+        sample_diameter=None, curved_detector=False, field_of_view=None,
+        pixel_size=None)
+    for grating in ['g0', 'g1', 'g2']:
+        parameters['pitch_'+grating] = None
+        parameters['duty_cycle_'+grating] = None
+        parameters['radius_'+grating] = None
+        parameters[grating+'_bent'] = False
+        parameters[grating+'_matching'] = False
+    parameters.update(kwargs)
+    return parameters
+
+
+class GeometryTestCase(unittest.TestCase):
+    """
+    Compares Geometry results with expected values.
+    """
+    def assertResults(self, parameters, expected):
+        results = Geometry(parameters).results
+        for key, value in sorted(expected.items()):
+            self.assertAlmostEqual(results[key], value, places=9, msg=key)
+        return results
+
+
+class TestParallel(GeometryTestCase):
+
+    def test_g1_fixed(self):
+        parameters = _parameters(['G1', 'G2'], beam_geometry='parallel',
+                                 fixed_grating='g1', pitch_g1=4.0,
+                                 duty_cycle_g1=0.4, distance_source_g1=1000.0)
+        self.assertResults(parameters, {
+            'pitch_g2': 2.0, 'duty_cycle_g2': 0.4, 'distance_g1_g2': 40.0,
+            'distance_source_g2': 1040.0, 'distance_source_detector': 1140.0})
+
+    def test_g2_fixed(self):
+        parameters = _parameters(['G1', 'G2'], beam_geometry='parallel',
+                                 fixed_grating='g2', pitch_g2=2.0,
+                                 duty_cycle_g2=0.4, distance_source_g1=1000.0)
+        self.assertResults(parameters, {
+            'pitch_g1': 4.0, 'duty_cycle_g1': 0.4, 'distance_g1_g2': 40.0})
+
+
+class TestConventional(GeometryTestCase):
+
+    def test_g1_fixed_source_g1(self):
+        parameters = _parameters(['G1', 'G2'], fixed_grating='g1',
+                                 pitch_g1=4.0, duty_cycle_g1=0.5,
+                                 fixed_distance='distance_source_g1',
+                                 distance_source_g1=200.0)
+        self.assertResults(parameters, {
+            'distance_g1_g2': 50.0, 'distance_source_g2': 250.0,
+            'distance_source_detector': 350.0, 'pitch_g2': 2.5,
+            'duty_cycle_g2': 0.5})
+
+    def test_g1_fixed_source_g2(self):
+        parameters = _parameters(['G1', 'G2'], fixed_grating='g1',
+                                 pitch_g1=4.0, duty_cycle_g1=0.5,
+                                 fixed_distance='distance_source_g2',
+                                 distance_source_g2=250.0)
+        self.assertResults(parameters, {
+            'distance_source_g1': 200.0, 'distance_g1_g2': 50.0,
+            'pitch_g2': 2.5})
+
+    def test_g1_fixed_source_g2_too_small(self):
+        parameters = _parameters(['G1', 'G2'], fixed_grating='g1',
+                                 pitch_g1=4.0, duty_cycle_g1=0.5,
+                                 fixed_distance='distance_source_g2',
+                                 distance_source_g2=160.0)
+        self.assertRaises(GeometryError, Geometry, parameters)
+
+    def test_g2_fixed_source_g1(self):
+        parameters = _parameters(['G1', 'G2'], fixed_grating='g2',
+                                 pitch_g2=2.0, duty_cycle_g2=0.5,
+                                 fixed_distance='distance_source_g1',
+                                 distance_source_g1=90.0)
+        self.assertResults(parameters, {
+            'distance_g1_g2': 30.0, 'distance_source_g2': 120.0,
+            'pitch_g1': 3.0, 'duty_cycle_g1': 0.5})
+
+    def test_g2_fixed_source_g2(self):
+        parameters = _parameters(['G1', 'G2'], fixed_grating='g2',
+                                 pitch_g2=2.0, duty_cycle_g2=0.5,
+                                 fixed_distance='distance_source_g2',
+                                 distance_source_g2=120.0)
+        self.assertResults(parameters, {
+            'distance_source_g1': 90.0, 'distance_g1_g2': 30.0,
+            'pitch_g1': 3.0})
+
+    def test_g2_fixed_with_g0(self):
+        parameters = _parameters(['G0', 'G1', 'G2'], fixed_grating='g2',
+                                 pitch_g2=2.0, duty_cycle_g2=0.5,
+                                 fixed_distance='distance_g0_g1',
+                                 distance_g0_g1=90.0,
+                                 distance_source_g0=10.0)
+        self.assertResults(parameters, {
+            'distance_g1_g2': 30.0, 'distance_g0_g2': 120.0,
+            'distance_source_g1': 100.0, 'distance_source_g2': 130.0,
+            'pitch_g1': 3.0, 'pitch_g0': 6.0, 'duty_cycle_g0': 0.5})
+
+    def test_g0_fixed_g0_g1(self):
+        parameters = _parameters(['G0', 'G1', 'G2'], fixed_grating='g0',
+                                 pitch_g0=2.0, duty_cycle_g0=0.3,
+                                 fixed_distance='distance_g0_g1',
+                                 distance_g0_g1=8.0, distance_source_g0=10.0)
+        self.assertResults(parameters, {
+            'distance_g1_g2': 2.0, 'distance_g0_g2': 10.0,
+            'distance_source_g2': 20.0, 'pitch_g2': 0.5, 'pitch_g1': 0.8,
+            'duty_cycle_g1': 0.3, 'duty_cycle_g2': 0.3})
+
+    def test_g0_fixed_g0_g2(self):
+        parameters = _parameters(['G0', 'G1', 'G2'], fixed_grating='g0',
+                                 pitch_g0=2.0, duty_cycle_g0=0.3,
+                                 fixed_distance='distance_g0_g2',
+                                 distance_g0_g2=10.0, distance_source_g0=10.0)
+        self.assertResults(parameters, {
+            'distance_g0_g1': 8.0, 'distance_g1_g2': 2.0, 'pitch_g2': 0.5,
+            'pitch_g1': 0.8})
+
+    def test_g0_fixed_g0_g1_too_large(self):
+        # l = 20 mm gives dn = l, but conventional requires l > dn
+        parameters = _parameters(['G0', 'G1', 'G2'], fixed_grating='g0',
+                                 pitch_g0=2.0, duty_cycle_g0=0.3,
+                                 fixed_distance='distance_g0_g1',
+                                 distance_g0_g1=20.0, distance_source_g0=10.0)
+        self.assertRaises(GeometryError, Geometry, parameters)
+
+
+class TestSymmetrical(GeometryTestCase):
+
+    def test_g1_fixed(self):
+        parameters = _parameters(['G1', 'G2'], gi_geometry='sym',
+                                 fixed_grating='g1', pitch_g1=4.0,
+                                 duty_cycle_g1=0.5)
+        self.assertResults(parameters, {
+            'distance_source_g1': 80.0, 'distance_g1_g2': 80.0,
+            'distance_source_g2': 160.0, 'pitch_g2': 4.0})
+
+    def test_g0_fixed(self):
+        parameters = _parameters(['G0', 'G1', 'G2'], gi_geometry='sym',
+                                 fixed_grating='g0', pitch_g0=4.0,
+                                 duty_cycle_g0=0.5, distance_source_g0=10.0)
+        self.assertResults(parameters, {
+            'distance_g0_g1': 80.0, 'distance_g1_g2': 80.0,
+            'distance_source_g2': 170.0, 'pitch_g1': 4.0, 'pitch_g2': 4.0})
+
+
+class TestInverse(GeometryTestCase):
+
+    def test_g1_fixed_source_g1(self):
+        parameters = _parameters(['G1', 'G2'], gi_geometry='inv',
+                                 fixed_grating='g1', pitch_g1=4.0,
+                                 duty_cycle_g1=0.5,
+                                 fixed_distance='distance_source_g1',
+                                 distance_source_g1=50.0)
+        self.assertResults(parameters, {
+            'distance_g1_g2': 200.0, 'distance_source_g2': 250.0,
+            'pitch_g2': 10.0})
+
+    def test_g1_fixed_source_g2(self):
+        parameters = _parameters(['G1', 'G2'], gi_geometry='inv',
+                                 fixed_grating='g1', pitch_g1=4.0,
+                                 duty_cycle_g1=0.5,
+                                 fixed_distance='distance_source_g2',
+                                 distance_source_g2=250.0)
+        self.assertResults(parameters, {
+            'distance_source_g1': 50.0, 'distance_g1_g2': 200.0,
+            'pitch_g2': 10.0})
+
+    def test_g1_fixed_source_g1_too_large(self):
+        parameters = _parameters(['G1', 'G2'], gi_geometry='inv',
+                                 fixed_grating='g1', pitch_g1=4.0,
+                                 duty_cycle_g1=0.5,
+                                 fixed_distance='distance_source_g1',
+                                 distance_source_g1=200.0)
+        self.assertRaises(GeometryError, Geometry, parameters)
+
+    def test_g1_fixed_source_g1_equal(self):
+        # l = 80 mm gives dn = l, inverse requires l < dn
+        parameters = _parameters(['G1', 'G2'], gi_geometry='inv',
+                                 fixed_grating='g1', pitch_g1=4.0,
+                                 duty_cycle_g1=0.5,
+                                 fixed_distance='distance_source_g1',
+                                 distance_source_g1=80.0)
+        self.assertRaises(GeometryError, Geometry, parameters)
+
+    def test_g2_fixed_source_g1(self):
+        parameters = _parameters(['G1', 'G2'], gi_geometry='inv',
+                                 fixed_grating='g2', pitch_g2=2.0,
+                                 duty_cycle_g2=0.5,
+                                 fixed_distance='distance_source_g1',
+                                 distance_source_g1=2.0)
+        self.assertResults(parameters, {
+            'distance_g1_g2': 8.0, 'distance_source_g2': 10.0,
+            'pitch_g1': 0.8})
+
+    def test_g2_fixed_source_g1_invalid(self):
+        # l = 90 mm gives dn = 30 mm, but inverse requires l < dn
+        parameters = _parameters(['G1', 'G2'], gi_geometry='inv',
+                                 fixed_grating='g2', pitch_g2=2.0,
+                                 duty_cycle_g2=0.5,
+                                 fixed_distance='distance_source_g1',
+                                 distance_source_g1=90.0)
+        self.assertRaises(GeometryError, Geometry, parameters)
+
+    def test_g2_fixed_source_g1_equal(self):
+        # l = 20 mm gives dn = l, inverse requires l < dn
+        parameters = _parameters(['G1', 'G2'], gi_geometry='inv',
+                                 fixed_grating='g2', pitch_g2=2.0,
+                                 duty_cycle_g2=0.5,
+                                 fixed_distance='distance_source_g1',
+                                 distance_source_g1=20.0)
+        self.assertRaises(GeometryError, Geometry, parameters)
+
+    def test_g0_fixed_g0_g1(self):
+        parameters = _parameters(['G0', 'G1', 'G2'], gi_geometry='inv',
+                                 fixed_grating='g0', pitch_g0=2.0,
+                                 duty_cycle_g0=0.5,
+                                 fixed_distance='distance_g0_g1',
+                                 distance_g0_g1=30.0, distance_source_g0=10.0)
+        self.assertResults(parameters, {
+            'distance_g1_g2': 90.0, 'distance_g0_g2': 120.0,
+            'pitch_g2': 6.0, 'pitch_g1': 3.0})
+
+
+class TestSample(GeometryTestCase):
+
+    def test_before_g1(self):
+        parameters = _parameters(['G0', 'Sample', 'G1', 'G2'],
+                                 fixed_grating='g1', pitch_g1=4.0,
+                                 duty_cycle_g1=0.5,
+                                 fixed_distance='distance_g0_g1',
+                                 distance_g0_g1=200.0,
+                                 distance_source_g0=100.0,
+                                 sample_position='bg1', sample_distance=10.0,
+                                 sample_diameter=4.0, sample_shape='circular')
+        self.assertResults(parameters, {
+            'distance_source_g1': 300.0, 'distance_source_sample': 288.0,
+            'sample_distance': 10.0, 'sample_diameter': 4.0})
+
+    def test_after_g1(self):
+        parameters = _parameters(['G1', 'Sample', 'G2'], gi_geometry='sym',
+                                 fixed_grating='g1', pitch_g1=4.0,
+                                 duty_cycle_g1=0.5, sample_position='ag1',
+                                 sample_distance=10.0, sample_diameter=4.0,
+                                 sample_shape='circular')
+        self.assertResults(parameters, {
+            'distance_source_g1': 80.0, 'distance_source_sample': 92.0})
+
+    def test_after_g1_too_large(self):
+        parameters = _parameters(['G1', 'Sample', 'G2'], gi_geometry='sym',
+                                 fixed_grating='g1', pitch_g1=4.0,
+                                 duty_cycle_g1=0.5, sample_position='ag1',
+                                 sample_distance=70.0, sample_diameter=20.0,
+                                 sample_shape='circular')
+        self.assertRaises(GeometryError, Geometry, parameters)
+
+
+if __name__ == '__main__':
+    unittest.main()